@@ -1,22 +1,28 @@
 from __future__ import annotations
 
-import csv
+import copy
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Callable
+from typing import IO, Callable
+
+import pandas as pd
 
 """
 This module provides classes and functions for loading and managing classification data from a CSV file.
 """
+# fields of a results row that must not be empty, the receiver and the date of the file are optional
+REQUIRED_FIELDS = ('docdate', 'doctype', 'sendername', 'docid', 'extension')
+# the fields of a FileData that are read from and written to a results file, besides the id
+FILE_FIELDS = ('docdate', 'doctype', 'sendername', 'docid', 'receivername', 'dateoffile', 'extension')
+# the columns of a results file, other columns are not read
+RESULT_COLUMNS = ('scanfile',) + FILE_FIELDS
+# rows read at once from a results file
+CSV_CHUNK_ROWS = 100_000
+# the feature keys of the LLM and the fields they are stored in
+_FEATURE_MAP = {"Document Date": "docdate", "Document Type": "doctype", "Sender": "sendername", "Invoice Number": "docid"}
 
+@dataclass(slots=True)
 class FileData :
-    docdate : str
-    doctype : str
-    sendername : str
-    docid : str
-    receivername : str
-    dateoffile : str
-    extension : str
-    is_complete : bool
     """
     Represents a single row of classification data.
 
@@ -28,69 +34,106 @@ class FileData :
         receivername (str): The receiver's name.
         dateoffile (str): The date of the file.
         extension (str): The file extension.
+        id (str): The path of the PDF file.
+        is_complete (bool): True if no field is missing.
     """
+    docdate : str = None
+    doctype : str = None
+    sendername : str = None
+    docid : str = None
+    receivername : str = None
+    dateoffile : str = None
+    extension : str = None
+    id : str = None
+    is_complete : bool = False
+
     def init_from_dict(self, id: str, row: dict[str, str]) -> tuple[FileData, bool]:
         self.id = id
-        for key in ['docdate', 'doctype', 'sendername', 'docid', 'receivername', 'dateoffile', 'extension']:
+        for key in FILE_FIELDS:
             setattr(self, key, row.get(key))
 
-        self.is_complete = all(x is not None for x in [self.docdate, self.doctype, self.sendername, self.docid, self.receivername, self.dateoffile, self.extension])
+        self.is_complete = all(getattr(self, key) is not None for key in FILE_FIELDS)
         return self,self.is_complete
 
     def get_sanitized(self, sanitize_func:Callable[[str], str]) -> FileData:
-        return FileData().init_from_dict(self.id, {
-            k: sanitize_func(v) if v is not None else None
-            for k, v in self.__dict__.items()
-            if k not in ['is_complete', 'id']
-        })[0]
-
-    def __init__(self):
-        self.is_complete = False
+        # a shallow copy keeps id and is_complete, missing fields stay None
+        sanitized = copy.copy(self)
+        for key in FILE_FIELDS:
+            if (value := getattr(self, key)) is not None:
+                setattr(sanitized, key, sanitize_func(value))
+        return sanitized
+
+    @classmethod
+    def from_row(cls, row: pd.Series) -> FileData:
         """
-        Initializes a new instance of the FileData class.
+        Creates the FileData of a row of the DataFrame returned by load_classification_data.
+
+        Args:
+            row: the row with the FILE_FIELDS, the name of the row is the scanfile.
+
+        Returns:
+            The FileData, missing fields are None.
         """
+        values = [None if pd.isna(row[key]) else row[key] for key in FILE_FIELDS]
+        return cls(*values, id=row.name, is_complete=all(value is not None for value in values))
+
+    def to_dict(self) -> dict[str, str | bool]:
+        """Returns the fields, the id and is_complete as dictionary."""
+        return asdict(self)
 
     def init_from_features(self, features) -> FileData:
-        # if the quality score is <=0.9, should append the score in the value field in square brackets
-        for key in ["Document Date", "Document Type", "Sender", "Invoice Number"]:
-            if features.loc[key, "quality"] < 0.9:
-                feat_value = features.loc[key, "value"] or "unknown"
-                features.loc[key, "value"] = f"{feat_value}[{features.loc[key, 'quality']}]"
-
-        self.id = features.loc["id", "value"]
-        self.docdate = features.loc["Document Date", "value"] or "unknown"
-        self.doctype = features.loc["Document Type", "value"] or "unknown"
-        self.sendername = features.loc["Sender", "value"] or "unknown"
-        self.docid = features.loc["Invoice Number", "value"] or "unknown"
+        # plain dicts instead of repeated .loc lookups on the DataFrame
+        vals = features["value"].to_dict()
+        quals = features["quality"].to_dict()
+        self.id = vals["id"]
+        for key, field in _FEATURE_MAP.items():
+            value = vals.get(key)
+            # an empty value of a feature file read back with read_csv is NaN, it is unknown like an empty one
+            if pd.isna(value):
+                value = None
+            # if the quality score is <=0.9, should append the score in the value field in square brackets
+            if quals[key] < 0.9:
+                value = f"{value or 'unknown'}[{quals[key]}]"
+            setattr(self, field, value or "unknown")
         self.receivername = ""
         self.dateoffile = ""
         self.extension = "pdf"
 
-        self.is_complete = all(x is not None for x in [self.docdate, self.doctype, self.sendername, self.docid, self.receivername, self.dateoffile, self.extension])
+        self.is_complete = all(getattr(self, key) is not None for key in FILE_FIELDS)
         return self
 
 
-def load_classification_data(csv_file: Path) -> dict[str, FileData]:
+def load_classification_data(csv_file: Path | IO[str]) -> pd.DataFrame:
     """
-    Loads classification data from a CSV file.
+    Loads classification data from a CSV file, incomplete rows are skipped.
+
+    A row is incomplete if it misses a field or if one of the REQUIRED_FIELDS is empty. The CSV reader pads short
+    rows with empty fields, so an empty required field is treated like a missing one. The receiver and the date of
+    the file may be empty.
 
     Args:
-        csv_file: The path to the CSV file.
+        csv_file: The path to the CSV file or an open text file.
 
     Returns:
-        A dictionary where keys are PDF filenames and values are dictionaries
-        containing the classification data.
+        A DataFrame with the FILE_FIELDS as string columns, indexed by the scanfile.
+        Use FileData.from_row to get the FileData of a row.
     """
-    data = {}
-    with open(csv_file, 'r', newline='') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            row_obj, is_complete = FileData().init_from_dict(row['scanfile'], row)
-            if is_complete:
-                data[row_obj.id] = row_obj
-            else:
-                print(f"{row_obj.id} is not complete")
-    return data
+    chunks = []
+    # all fields are read as text, short rows are padded with empty fields
+    for chunk in pd.read_csv(csv_file, usecols=lambda column: column in RESULT_COLUMNS, dtype="string",
+                             keep_default_na=False, chunksize=CSV_CHUNK_ROWS):
+        # columns missing in the file are added as NA, a row is complete if no field is NA and no required field is empty
+        chunk = chunk.reindex(columns=list(RESULT_COLUMNS))
+        is_complete = chunk[list(FILE_FIELDS)].notna().all(axis=1) & chunk[list(REQUIRED_FIELDS)].ne("").all(axis=1)
+        for scanfile in chunk.loc[~is_complete, "scanfile"]:
+            print(f"{scanfile} is not complete")
+        chunks.append(chunk[is_complete])
+
+    if not chunks:
+        return pd.DataFrame(columns=list(FILE_FIELDS), dtype="string", index=pd.Index([], name="scanfile", dtype="string"))
+    data = pd.concat(chunks).set_index("scanfile")
+    # a scanfile listed twice keeps its last row
+    return data[~data.index.duplicated(keep="last")]
 
 if __name__ == "__main__":
     print("This is module - use the pdfclassify.py script as entry point")
@@ -1,34 +1,217 @@
+import asyncio
+import atexit
+import hashlib
 import logging
 import os
 import re
+import tempfile
+import threading
 import time
+from collections import OrderedDict, deque
+from pathlib import Path
 
 import google.generativeai as genai
+import orjson
 import pandas as pd
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted, ServiceUnavailable
+
+# maximum number of LLM calls running at the same time in a batch
+MAX_CONCURRENT_CALLS = 4
+# timeout of a single LLM call in seconds
+REQUEST_TIMEOUT_SECONDS = 20
+# the response has four short entries, this caps the cost of a runaway response
+MAX_OUTPUT_TOKENS = 256
+# number of attempts for a call that fails with a transient error (rate limit, timeout, unavailable service)
+MAX_ATTEMPTS = 3
+# wait time in seconds after the first failed attempt, doubled with every attempt up to MAX_RETRY_BACKOFF_SECONDS
+RETRY_BACKOFF_SECONDS = 1.0
+MAX_RETRY_BACKOFF_SECONDS = 10.0
+# maximum number of characters of OCR text sent to the LLM, roughly 1500 tokens. Dates, senders and invoice numbers
+# are in the upper part of a page, the text is sorted top down before it is truncated
+MAX_OCR_CHARS = 6000
+# words with a lower tesseract confidence are mostly noise and are not sent to the LLM
+MIN_WORD_CONF = 30
+# a warning is logged if the estimated prompt size exceeds this number of tokens
+MAX_PROMPT_TOKENS = 2200
+# default limits of the API, requests per minute and tokens per minute
+DEFAULT_RPM = 60
+DEFAULT_TPM = 100_000
+# version of the prompt and the response format in the cache keys, raise it when the parsing of the responses changes.
+# The response schema and the model name are part of the keys as well
+CACHE_VERSION = 1
+# number of parsed responses an extractor keeps in memory, identical pages are only sent once per run
+MEMO_SIZE = 1024
+
+_WHITESPACE = re.compile(r"\s+")
+# spaces and parentheses in a value are replaced with dashes
+_DASH_TABLE = str.maketrans({" ": "-", "(": "-", ")": "-"})
+_TRANSIENT_ERRORS = (TimeoutError, DeadlineExceeded, ResourceExhausted, ServiceUnavailable)
+# the keys of the features, in the order of the resulting DataFrame
+FEATURE_KEYS = ["Document Date", "Document Type", "Sender", "Invoice Number"]
+# one line of a line based response, "key: value (quality)"
+_RESPONSE_LINE = re.compile(rf"^(?P<key>{'|'.join(FEATURE_KEYS)})[:]\s*(?P<value>[^(]+)\s*\((?P<quality>[0-9.]+)\)")
+# the LLM answers with a JSON object holding value and quality for every feature key
+_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {key: {"type": "object",
+                         "properties": {"value": {"type": "string"}, "quality": {"type": "number"}},
+                         "required": ["value", "quality"]}
+                   for key in FEATURE_KEYS},
+    "required": FEATURE_KEYS,
+}
+_GENERATION_CONFIG = genai.types.GenerationConfig(max_output_tokens=MAX_OUTPUT_TOKENS,
+                                                  response_mime_type="application/json",
+                                                  response_schema=_RESPONSE_SCHEMA)
+# the SDK retries unavailable services for minutes around the timeout, the calls are retried by _agenerate instead
+_REQUEST_OPTIONS = {"timeout": REQUEST_TIMEOUT_SECONDS, "retry": None}
+# the models of the process by api key and model name, they are shared by all extractors
+_model_cache: dict[tuple[str, str], genai.GenerativeModel] = {}
+_model_cache_lock = threading.Lock()
+# the async client of the SDK is a process global bound to the event loop of its first call, every batch of the
+# process runs on this one loop. A loop per batch would leave the client on a closed loop
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _build_model(api_key: str, model_name: str) -> genai.GenerativeModel:
+    """
+    Returns the model for the api key and model name, the model is created once per process.
+
+    Args:
+        api_key: The API key for the LLM service.
+        model_name: The name of the LLM model.
+
+    Returns:
+        The shared model.
+    """
+    with _model_cache_lock:
+        model = _model_cache.get((api_key, model_name))
+        if model is None:
+            genai.configure(api_key=api_key)
+            model = _model_cache[(api_key, model_name)] = genai.GenerativeModel(model_name)
+        return model
+
+
+def _run(coroutine):
+    """
+    Runs a coroutine on the event loop of the process, the loop is created with the first call and closed at exit.
+
+    Args:
+        coroutine: The coroutine to run.
+
+    Returns:
+        The result of the coroutine.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            atexit.register(_loop.close)
+        return _loop.run_until_complete(coroutine)
+
+
+class RateLimiter:
+    """
+    A sliding window limiter for the requests per minute (RPM) and tokens per minute (TPM) of the LLM API.
+
+    A call is started immediately as long as the last minute has capacity left, otherwise the caller waits until
+    the oldest call leaves the window. The effective RPM follows an AIMD scheme: a call rejected by the API halves
+    the RPM, every SUCCESSES_TO_INCREASE successful calls raise it by a tenth of the configured RPM again.
+    """
+    WINDOW_SECONDS = 60.0
+    SUCCESSES_TO_INCREASE = 20
+
+    def __init__(self, rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM):
+        """
+        Args:
+            rpm: The maximum number of requests per minute.
+            tpm: The maximum number of tokens per minute.
+        """
+        self.max_rpm = rpm
+        self.rpm = rpm
+        self.tpm = tpm
+        self._calls: deque[tuple[float, int]] = deque()
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Registers a call if the window has capacity for it.
+
+        Args:
+            tokens: The estimated number of tokens of the call.
+
+        Returns:
+            0 if the call was registered, otherwise the seconds to wait before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and self._calls[0][0] <= now - self.WINDOW_SECONDS:
+                self._calls.popleft()
+            used_tokens = sum(call_tokens for _, call_tokens in self._calls)
+            # a single call larger than the token limit is allowed in an empty window, it would never fit otherwise
+            if len(self._calls) < self.rpm and (used_tokens + tokens <= self.tpm or not self._calls):
+                self._calls.append((now, tokens))
+                return 0.0
+            return max(self._calls[0][0] + self.WINDOW_SECONDS - now, 0.01)
+
+    async def aacquire(self, tokens: int):
+        """
+        Waits until the call fits into the limits and registers it.
+
+        Args:
+            tokens: The estimated number of tokens of the call.
+        """
+        while (wait := self._reserve(tokens)) > 0:
+            logging.info(f"API rate limit - sleeping for {wait:.1f} seconds")
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """Registers a successful call, increases the RPM additively after SUCCESSES_TO_INCREASE successes."""
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.SUCCESSES_TO_INCREASE:
+                self._successes = 0
+                self.rpm = min(self.max_rpm, self.rpm + max(1, self.max_rpm // 10))
+
+    def on_rate_limited(self):
+        """Registers a call rejected by the API, halves the RPM."""
+        with self._lock:
+            self._successes = 0
+            self.rpm = max(1, self.rpm // 2)
+            logging.info(f"API rate limit exhausted - reducing to {self.rpm} requests per minute")
 
-# time between two calls in seconds
-THROTTLE_SECONDS = 2.0
 
 class LLMDataExtractor:
     """
     A class to extract key data elements from a Tesseract OCR DataFrame using a Large Language Model (LLM).
     """
 
-    def __init__(self, api_key: str = None, model_name: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: str = None, model_name: str = "gemini-2.0-flash", cache_dir: Path = None,
+                 rate_limiter: RateLimiter = None, refresh_cache: bool = False):
         """
         Initializes the LLMDataExtractor with the specified API key and model name.
 
         Args:
             api_key: The API key for the LLM service. If None, it will try to get it from the environment variable "GOOGLE_API_KEY".
             model_name: The name of the LLM model to use (default: "gemini-pro").
+            cache_dir: If set, the parsed LLM responses are stored in this folder and reused for identical prompts.
+            rate_limiter: The limiter for the calls to the API, defaults to a RateLimiter with DEFAULT_RPM and DEFAULT_TPM.
+            refresh_cache: If set, the cache is not read, every prompt is sent to the LLM and the cache is rewritten.
         """
-        self.last_call = 0
+        self.limiter = rate_limiter or RateLimiter()
+        self._memo: OrderedDict[str, pd.DataFrame] = OrderedDict()
+        self.cache_dir = cache_dir
+        self.refresh_cache = refresh_cache
+        # responses of another model, schema or response format are not reused
+        self._cache_tag = f"{model_name}\n{CACHE_VERSION}\n{orjson.dumps(_RESPONSE_SCHEMA).decode()}"
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
         if api_key is None:
             api_key = os.environ.get("GOOGLE_API_KEY")
             if api_key is None:
                 raise ValueError("No API key provided and GOOGLE_API_KEY environment variable not set.")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+        self.model = _build_model(api_key, model_name)
 
     def extract_features(self, tesseract_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -40,28 +223,181 @@ class LLMDataExtractor:
         Returns:
             A pandas DataFrame with extracted features (key, value, quality).
         """
-        if time.time() - self.last_call < THROTTLE_SECONDS:
-            sleep_time = THROTTLE_SECONDS - (time.time() - self.last_call)
-            logging.info(f"API call throttle - sleeping for {sleep_time} seconds")
-            time.sleep(sleep_time)
-
         if tesseract_df.empty:
             return pd.DataFrame(columns=["key", "value", "quality"])
 
-        # Prepare the prompt for the LLM
-        prompt = self._create_prompt(tesseract_df)
+        # the same path as the batches, on the event loop of the process
+        return _run(self._aextract_prompt(self._create_prompt(tesseract_df), asyncio.Semaphore(1)))
+
+    async def _aextract_prompt(self, prompt: str, semaphore: asyncio.Semaphore) -> pd.DataFrame:
+        """
+        Extracts the features for a prompt, from the cache or with an LLM call limited by the semaphore.
+
+        Args:
+            prompt: The prompt for the LLM.
+            semaphore: The semaphore shared by all calls of a batch.
+
+        Returns:
+            A pandas DataFrame with extracted features (key, value, quality).
+        """
+        cached = self._read_cache(prompt)
+        if cached is not None:
+            return cached
 
-        # Get the response from the LLM
         try:
-            self.last_call = time.time()
-            response = self.model.generate_content(prompt)
-            response.resolve()
+            async with semaphore:
+                response = await self._agenerate(prompt)
         except Exception as e:
             print(f"Error during LLM call: {e}")
             return pd.DataFrame(columns=["key", "value", "quality"])
 
-        # Parse the response and create the output DataFrame
-        return self._parse_response(response.text)
+        features = self._parse_response(response.text)
+        self._write_cache(prompt, features)
+        return features
+
+    def extract_features_batch(self, tesseract_dfs: list[pd.DataFrame]) -> list[pd.DataFrame]:
+        """
+        Extracts the features of many Tesseract DataFrames, the LLM calls run concurrently.
+
+        Args:
+            tesseract_dfs: The Tesseract DataFrames, e.g. all pages of all PDFs.
+
+        Returns:
+            The features for each DataFrame, in the same order as tesseract_dfs.
+        """
+        prompts = [self._create_prompt(df) if not df.empty else None for df in tesseract_dfs]
+        keys = [self._prompt_key(prompt) if prompt is not None else None for prompt in prompts]
+        # pages with the same prompt, e.g. the same form letter in many PDFs, are sent once
+        unique_prompts = {key: prompt for key, prompt in zip(keys, prompts) if key is not None}
+
+        async def _gather():
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+            return await asyncio.gather(*(self._aextract_prompt(prompt, semaphore) for prompt in unique_prompts.values()))
+
+        features_by_key = dict(zip(unique_prompts, _run(_gather())))
+        return [features_by_key[key].copy() if key is not None else pd.DataFrame(columns=["key", "value", "quality"])
+                for key in keys]
+
+    async def _agenerate(self, prompt: str):
+        """
+        Calls the LLM within the limits of the rate limiter, calls failing with a transient error are retried
+        with exponential backoff.
+
+        Args:
+            prompt: The prompt for the LLM.
+
+        Returns:
+            The response of the LLM.
+        """
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self.limiter.aacquire(len(prompt) // 4)
+            try:
+                response = await self.model.generate_content_async(prompt,
+                                                                   generation_config=_GENERATION_CONFIG,
+                                                                   request_options=_REQUEST_OPTIONS)
+                self.limiter.on_success()
+                return response
+            except _TRANSIENT_ERRORS as e:
+                await asyncio.sleep(self._retry_backoff(attempt, e))
+
+    def _retry_backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Handles a transient error of an LLM call, re-raises the error if all attempts are used.
+
+        Args:
+            attempt: The number of the failed attempt, starting with 1.
+            error: The error of the failed attempt.
+
+        Returns:
+            The seconds to wait before the next attempt.
+        """
+        if isinstance(error, ResourceExhausted):
+            self.limiter.on_rate_limited()
+        if attempt >= MAX_ATTEMPTS:
+            logging.warning(f"LLM call failed after {attempt} attempts: {error}")
+            raise error
+        backoff = min(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1), MAX_RETRY_BACKOFF_SECONDS)
+        logging.info(f"LLM call attempt {attempt}/{MAX_ATTEMPTS} failed: {error} - retrying in {backoff} seconds")
+        return backoff
+
+    def _prompt_key(self, prompt: str) -> str:
+        """
+        Returns the key of a prompt in the memo and the cache, the sha256 of the normalized prompt.
+        All whitespace is collapsed, so pages whose OCR text only differs in layout share the same key. The case
+        is kept, senders and invoice numbers of the response end up in the file names. The model name, the
+        CACHE_VERSION and the response schema are hashed with the prompt.
+
+        Args:
+            prompt: The prompt sent to the LLM.
+
+        Returns:
+            The key as hex string.
+        """
+        normalized = _WHITESPACE.sub(" ", prompt).strip()
+        return hashlib.sha256(f"{self._cache_tag}\n{normalized}".encode()).hexdigest()
+
+    def _cache_file(self, prompt: str) -> Path | None:
+        """
+        Returns the cache file for a prompt, the file name is the key of the prompt.
+
+        Args:
+            prompt: The prompt sent to the LLM.
+
+        Returns:
+            The path of the cache file or None if caching is disabled.
+        """
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{self._prompt_key(prompt)}.csv"
+
+    def _read_cache(self, prompt: str) -> pd.DataFrame | None:
+        """
+        Reads the features for a prompt from the memo or the cache, the cache is skipped if refresh_cache is set.
+
+        Args:
+            prompt: The prompt sent to the LLM.
+
+        Returns:
+            The cached features or None if there is no cache entry.
+        """
+        key = self._prompt_key(prompt)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key].copy()
+        cache_file = self._cache_file(prompt)
+        if cache_file is None or self.refresh_cache or not cache_file.exists():
+            return None
+        logging.info(f"using cached LLM response {cache_file}")
+        features = pd.read_csv(cache_file, dtype={"key": str, "value": str}, keep_default_na=False)
+        self._remember(key, features)
+        return features
+
+    def _write_cache(self, prompt: str, features: pd.DataFrame):
+        """
+        Writes the features for a prompt to the memo and the cache. The file is written to a temp file first and then
+        renamed, so a cache file is always complete. Responses without any value are not cached and retried on the
+        next call.
+
+        Args:
+            prompt: The prompt sent to the LLM.
+            features: The parsed response of the LLM.
+        """
+        if not features["value"].astype(bool).any():
+            return
+        self._remember(self._prompt_key(prompt), features)
+        cache_file = self._cache_file(prompt)
+        if cache_file is None:
+            return
+        with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, suffix=".tmp", delete=False, newline="") as tmp_file:
+            features.to_csv(tmp_file, index=False)
+        os.replace(tmp_file.name, cache_file)
+
+    def _remember(self, key: str, features: pd.DataFrame):
+        """Keeps a copy of the features in the memo, the least recently used entry is dropped beyond MEMO_SIZE."""
+        self._memo[key] = features.copy()
+        self._memo.move_to_end(key)
+        if len(self._memo) > MEMO_SIZE:
+            self._memo.popitem(last=False)
 
     def _create_prompt(self, tesseract_df: pd.DataFrame) -> str:
         """
@@ -73,8 +409,7 @@ class LLMDataExtractor:
         Returns:
             The prompt string.
         """
-        # Extract relevant columns from the DataFrame
-        text_content = "\n".join(tesseract_df["text"].dropna().astype(str).tolist())
+        text_content = self._text_content(tesseract_df)
         prompt = f"""
         You are a document processing expert. Your task is to extract key information from a document.
         The document is represented as tabular text from a tesseract ocr in pandas dataframe format. The table contains information on page, line, word and position on page. Use the given locations to improve data extraction.
@@ -84,14 +419,10 @@ class LLMDataExtractor:
         - Sender: The name of the sender of the document.
         - Invoice Number: If the document type is "Other", leave blank. If the document is an invoice, the invoice number. If it is an account statement, first determine the type of account, for a bank account use the IBAN, for a credit card or Corporate card statement use the credit card number. Prefix the month of the statement as number (01,...,12) followed by a dash to the result. Make sure you do not use the IBAN of the bank as the account number, the bank IBAN is usually in the footer of the document, the account number is in the upper half of the document. Make sure to not use a random sequence of numbers found on the document as account number, IBAN or credit card numbers. IBANs and credit card numbers never start with a 0 and have no separators other than spaces or dashes, or no separators at all. Credit card numbers and corporate card numbers are exactly 16 digits long and in 4 groups of 4 digits each. A statement for a credit card or corporate card contains the words "credit card" or "corporate card".
         
-        Provide the extracted information in the following plain-text, line-based format:
-        key: value (quality)
-        key: value (quality)
-        ...
-
-        where "key" is the extracted information, "value" is the corresponding value, and "quality" is the confidence level of the extraction.
-        Use plain text in UTF-8 encoding. Do not use another structure for the output as described above.
-        Each key-value-quality tuple is on one line. 
+        Provide the extracted information as JSON object in the following format:
+        {{"Document Date": {{"value": "...", "quality": 0.9}}, "Document Type": {{"value": "...", "quality": 0.9}}, ...}}
+
+        where the key is the extracted information, "value" is the corresponding value, and "quality" is the confidence level of the extraction.
         Use for key only the keywords "Document Date", "Document Type", "Sender", and "Invoice Number". 
         Do not add other keys to the result. 
         Use all defined keys in every result.
@@ -102,11 +433,39 @@ class LLMDataExtractor:
         Here is the document text:
         {text_content}
         """
+        if len(prompt) // 4 > MAX_PROMPT_TOKENS:
+            logging.warning(f"prompt has about {len(prompt) // 4} tokens, more than {MAX_PROMPT_TOKENS}")
         return prompt
 
+    def _text_content(self, tesseract_df: pd.DataFrame) -> str:
+        """
+        Extracts the text for the prompt from the Tesseract DataFrame. Words with a confidence below MIN_WORD_CONF are
+        dropped, the lines are sorted top down per page and the text is truncated to MAX_OCR_CHARS.
+
+        Args:
+            tesseract_df: The Tesseract DataFrame.
+
+        Returns:
+            The text, one word per line.
+        """
+        if "conf" in tesseract_df.columns:
+            tesseract_df = tesseract_df[pd.to_numeric(tesseract_df["conf"], errors="coerce") >= MIN_WORD_CONF]
+        line_columns = ["page_num", "block_num", "par_num", "line_num"]
+        if all(column in tesseract_df.columns for column in line_columns + ["top"]):
+            # sort whole lines by their top position, the words of a line keep their order
+            line_top = tesseract_df.groupby(line_columns)["top"].transform("min")
+            tesseract_df = tesseract_df.assign(line_top=line_top).sort_values(["page_num", "line_top"], kind="stable")
+
+        text_content = "\n".join(tesseract_df["text"].dropna().astype(str).tolist())
+        if len(text_content) > MAX_OCR_CHARS:
+            logging.debug(f"truncating OCR text from {len(text_content)} to {MAX_OCR_CHARS} characters")
+            text_content = text_content[:MAX_OCR_CHARS].rsplit("\n", 1)[0]
+        return text_content
+
     def _parse_response(self, response_text: str) -> pd.DataFrame:
         """
-        Parses the LLM's response and creates the output DataFrame.
+        Parses the LLM's JSON response and creates the output DataFrame. Responses that are not JSON are parsed
+        as "key: value (quality)" lines.
 
         Args:
             response_text: The text response from the LLM.
@@ -114,32 +473,51 @@ class LLMDataExtractor:
         Returns:
             A pandas DataFrame with extracted features (key, value, quality).
         """
-        data = []
-        lines = response_text.strip().split("\n")
-        valid_keys = ["Document Date", "Document Type", "Sender", "Invoice Number"]
+        try:
+            response = orjson.loads(response_text)
+        except orjson.JSONDecodeError:
+            return self._parse_lines(response_text)
 
-        pattern = r"(Document Date|Document Type|Sender|Invoice Number)[:]\s*([^(]+)\s*\(([0-9.]+)\)"
+        try:
+            entries = [response[key] for key in FEATURE_KEYS]
+            values = [str(entry["value"]).strip().translate(_DASH_TABLE) for entry in entries]
+            qualities = [float(entry["quality"]) for entry in entries]
+        except (KeyError, TypeError, ValueError):
+            logging.warning(f"received invalid response: {response_text}")
+            return self._invalid_response()
+        return pd.DataFrame({"key": FEATURE_KEYS, "value": values, "quality": qualities})
 
-        for line in lines:
-            match = re.match(pattern, line)
-            if match is not None:
-                key = match.group(1)
-                value = match.group(2).strip()
-                value = value.replace(" ", "-").replace("(", "-").replace(")", "-")
-                quality = float(match.group(3))
-                data.append({"key": key, "value": value, "quality": quality})
-            else:
-                logging.debug(f"skipping line: {line}")
+    def _parse_lines(self, response_text: str) -> pd.DataFrame:
+        """
+        Parses a line based response of the LLM, one "key: value (quality)" per line.
 
-        if len(data) != 4:
+        Args:
+            response_text: The text response from the LLM.
+
+        Returns:
+            A pandas DataFrame with extracted features (key, value, quality).
+        """
+        lines = pd.Series(response_text.strip().splitlines())
+        df = lines.str.extract(_RESPONSE_LINE)
+        matched = df.notna().all(axis=1)
+        if not matched.all():
+            logging.debug(f"skipping lines: {lines[~matched].tolist()}")
+
+        if matched.sum() != 4:
             logging.warning(f"received invalid response: {response_text}")
-            return pd.DataFrame(
-                    {"key": valid_keys, "value": [""] * len(valid_keys), "quality": [0.1] * len(valid_keys)},
-                    columns=["key", "value", "quality"])
+            return self._invalid_response()
 
-        df = pd.DataFrame(data)
+        df = df[matched].reset_index(drop=True)
+        df["value"] = df["value"].str.strip().str.translate(_DASH_TABLE)
+        df["quality"] = df["quality"].astype(float)
         return df
 
+    @staticmethod
+    def _invalid_response() -> pd.DataFrame:
+        """The features of an invalid response, all keys with empty values and a low quality."""
+        return pd.DataFrame({"key": FEATURE_KEYS, "value": [""] * len(FEATURE_KEYS), "quality": [0.1] * len(FEATURE_KEYS)},
+                            columns=["key", "value", "quality"])
+
 if __name__ == "__main__":
     print("This is module - use the pdfclassify.py script as entry point")
     exit(-1)
\ No newline at end of file
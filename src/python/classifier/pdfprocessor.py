@@ -2,9 +2,11 @@
 This module processes pdf files in a folder into images per page and feeds the images into tesseract for OCR.
 
 For each PDF, there will be a temp folder containing
-- one image per page
+- one image per page, if the images are kept
 - a data file with the text per page
+- a signature file of the PDF, rendering is skipped if the PDF is unchanged and all data files are fresh
 
+The pages are passed to tesseract as in-memory images, the images are only written to disk if keep_images is set.
 The PDF extraction is managed with PdfData objects that contains the Paths to the image files and datafiles.
 
 The datafiles are all written in a basefolder that is given into the constructor.
@@ -13,13 +15,40 @@ import logging
 import os
 import shutil
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from typing import List
 
 import pandas
 import pytesseract
 from PIL import Image
-from pdf2image import convert_from_path
+
+try:
+    # PyMuPDF renders the pages in-process, pdf2image starts poppler processes per PDF
+    import pymupdf
+except ImportError:
+    pymupdf = None
+try:
+    from pdf2image import convert_from_path
+except ImportError:
+    convert_from_path = None
+
+# resolution of the rendered pages, passed to tesseract as well
+RENDER_DPI = 200
+# file in the work folder with size and mtime of the PDF and the number of pages, written after rendering
+SIGNATURE_FILE = ".sig"
+
+# column types of the tesseract data, used when data files are read back
+TESSERACT_DTYPES = {
+    "level": "int8", "page_num": "int16", "block_num": "int16", "par_num": "int16", "line_num": "int16",
+    "word_num": "int16", "left": "int32", "top": "int32", "width": "int32", "height": "int32",
+    "conf": "float32", "text": "string",
+}
+
+# pages with a lower mean word confidence or less text are blank or unreadable and not worth classifying
+MIN_PAGE_CONF = 40
+MIN_PAGE_CHARS = 50
 
 
 class PdfData:
@@ -27,24 +56,35 @@ class PdfData:
     image_files: List[Path]
     data_files: List[Path]
     temp_dir: Path
+    page_images: List[Image.Image]
     data: List[pandas.DataFrame] = []
 
-    def __init__(self, pdf_file: Path, temp_base_dir: Path, force:bool=False):
+    def __init__(self, pdf_file: Path, temp_base_dir: Path, force:bool=False, keep_images:bool=False, ocr_threads:int=None):
         self.pdf_file = pdf_file
+        # the threads of this PDF, tesseract runs as a process per thread
+        self.ocr_threads = ocr_threads or os.cpu_count() or 1
         self.image_files = []
+        self.page_images = []
+        self.keep_images = keep_images
         self.data_files = []
         self.data = []
         self.force = force
         self.temp_dir = temp_base_dir / self.pdf_file.stem
-        self._mtime_of_pdf = os.path.getmtime(self.pdf_file)
-        if self.temp_dir.exists() :
-            # check if the tmp folder is older than the pdf_file or force is true
-            if os.path.getmtime(self.temp_dir) < self._mtime_of_pdf or force:
-                logging.warning(f"removing existing workfolder {self.temp_dir}")
-                self.cleanup()
-        # make sure, the temp folder exists, we need to check again, because it might have been cleaned up
-        if not self.temp_dir.exists():
-            self.temp_dir.mkdir(parents=True, exist_ok=True)
+        _stat = self.pdf_file.stat()
+        self._mtime_of_pdf = _stat.st_mtime
+        self._signature = f"{_stat.st_size}-{_stat.st_mtime_ns}"
+        # number of pages whose data files are reused without rendering the PDF
+        self._cached_pages = 0
+        # check if the tmp folder is older than the pdf_file or force is true
+        if self._is_overwrite(self.temp_dir) and self.temp_dir.exists():
+            logging.warning(f"removing existing workfolder {self.temp_dir}")
+            self.cleanup()
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def mtime_of_pdf(self) -> float:
+        """The modification time of the pdf file, taken once when the PdfData is created."""
+        return self._mtime_of_pdf
 
     def _is_overwrite(self, check_file: Path):
         """
@@ -53,78 +93,241 @@ class PdfData:
         :param check_file: The file to check.
         :return: True if the file should be overwritten, False otherwise.
         """
-        if not check_file.exists():
+        try:
+            return check_file.stat().st_mtime < self._mtime_of_pdf or self.force
+        except FileNotFoundError:
             return True
 
-        return os.path.getmtime(check_file) < self._mtime_of_pdf or self.force
-
     def cleanup(self):
         """Removes the temporary directory and its contents."""
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
+    def _render_pages(self) -> List[Image.Image]:
+        """
+        Renders the pages of the PDF with PyMuPDF, falls back to pdf2image if PyMuPDF is not installed.
+
+        Grayscale is sufficient for tesseract and needs a third of the memory and disk space of RGB.
+
+        :return: one grayscale image per page
+        """
+        if pymupdf is None:
+            if convert_from_path is None:
+                raise RuntimeError("neither PyMuPDF nor pdf2image is installed")
+            return convert_from_path(self.pdf_file, dpi=RENDER_DPI, grayscale=True, fmt="png", thread_count=os.cpu_count() or 1)
+
+        _matrix = pymupdf.Matrix(RENDER_DPI / 72, RENDER_DPI / 72)
+        _images = []
+        with pymupdf.open(self.pdf_file) as _doc:
+            for _page in _doc:
+                _pixmap = _page.get_pixmap(matrix=_matrix, colorspace=pymupdf.csGRAY)
+                _images.append(Image.frombytes("L", (_pixmap.width, _pixmap.height), _pixmap.samples, "raw", "L", _pixmap.stride))
+        return _images
+
+    def _is_rendered(self) -> bool:
+        """
+        Checks if the PDF is unchanged since the pages were rendered and the text of every page is extracted already.
+
+        :return: True if rendering can be skipped, the data files are read by extract_text.
+        """
+        if self.force:
+            return False
+        try:
+            _signature, _pages = (self.temp_dir / SIGNATURE_FILE).read_text().split("\n")
+            _pages = int(_pages)
+        except (OSError, ValueError):
+            return False
+        if _signature != self._signature:
+            return False
+        _page_names = [f"page_{i+1}" for i in range(_pages)]
+        if any(self._is_overwrite(self.temp_dir / f"{_page_name}.csv") for _page_name in _page_names):
+            return False
+        if self.keep_images:
+            _image_files = [self.temp_dir / f"{_page_name}.png" for _page_name in _page_names]
+            if not all(_image_file.exists() for _image_file in _image_files):
+                return False
+            self.image_files = _image_files
+        self._cached_pages = _pages
+        return True
+
     def extract_images(self):
-        """Extracts images from the PDF file."""
+        """Extracts images from the PDF file, the images are kept in memory and only saved if keep_images is set.
+
+        Rendering is skipped if the PDF is unchanged and the text of all pages is extracted already.
+        """
+        if self._is_rendered():
+            logging.info(f"using existing data of {self.pdf_file}, skipping rendering")
+            return
         try:
             logging.debug(f"Extracting _images from {self.pdf_file}")
-            _images = convert_from_path(self.pdf_file, dpi=200)
+            _images = self._render_pages()
             for i, _image in enumerate(_images):
                 logging.debug(f"Extracting image {i+1}/{len(_images)} from {self.pdf_file}")
+                self.page_images.append(_image)
+                if not self.keep_images:
+                    continue
                 _image_file: Path = self.temp_dir / f"page_{i+1}.png"
                 if self._is_overwrite(_image_file):
-                    _image.save(_image_file, "PNG")
+                    # fast compression, the images are intermediate files
+                    _image.save(_image_file, "PNG", compress_level=1)
                     logging.debug(f"overwrite existing image {_image_file}")
                 else:
                     logging.info(f"using existing image {_image_file}")
                 self.image_files.append(_image_file)
+            (self.temp_dir / SIGNATURE_FILE).write_text(f"{self._signature}\n{len(_images)}")
         except Exception as e:
             logging.error(f"Error extracting _images from {self.pdf_file}: {e}")
 
+    def _ocr_one(self, page_name: str, page: Image.Image | Path | None) -> tuple[Path, pandas.DataFrame] | None:
+        """
+        Extracts the text of a single page, reuses an existing data file if it is newer than the pdf.
+
+        :param page_name: the name of the page, used as name of the data file
+        :param page: the image of the page, either in memory or as image file, None if the data file is fresh
+        :return: the path of the data file and the text as DataFrame, None if the extraction failed
+        """
+        try:
+            data_path = self.temp_dir / f"{page_name}.csv"
+            if not self._is_overwrite(data_path):
+                logging.info(f"using existing data {data_path}")
+                # explicit types spare the type inference, words like "NA" or "null" are kept as text
+                text:pandas.DataFrame = pandas.read_csv(data_path, sep="\t", engine="c", dtype=TESSERACT_DTYPES,
+                                                        keep_default_na=False, na_values=[""])
+            else:
+                logging.debug(f"Extracting text as Dataframe from {page_name} of {self.pdf_file}")
+                if isinstance(page, Path):
+                    with Image.open(page) as image:
+                        text = self._image_to_data(image)
+                else:
+                    text = self._image_to_data(page)
+                text.to_csv(data_path, sep="\t", index=False)
+                logging.debug(f"Text extracted from {page_name} to {data_path}")
+            return data_path, text
+        except Exception as e:
+            logging.error(f"Error extracting text from {page_name} of {self.pdf_file}: {e}")
+            return None
+
+    @staticmethod
+    def _image_to_data(image: Image.Image) -> pandas.DataFrame:
+        """Runs tesseract on a single channel version of the image.
+
+        pytesseract hands the image to tesseract as temporary file, as uncompressed PGM (PIL format PPM) instead of
+        PNG the page is not compressed and decompressed.
+        """
+        # convert returns a new image also for single channel pages, the format of the caller's image is not changed
+        _gray = image.convert("L")
+        # pytesseract 0.3.x saves the temporary file in image.format (prepare/save), see test_image_to_data_format
+        _gray.format = "PPM"
+        text = pytesseract.image_to_data(_gray, lang="deu", config=f"--dpi {RENDER_DPI}", output_type=pytesseract.Output.DATAFRAME)
+        return PdfData._downcast(text)
+
+    @staticmethod
+    def _downcast(text: pandas.DataFrame) -> pandas.DataFrame:
+        """
+        Drops the layout rows of a tesseract DataFrame and narrows the columns to TESSERACT_DTYPES.
+
+        The layout rows have a confidence of -1 and no text, the words keep their page, block, paragraph and line
+        numbers. pytesseract returns int64, float64 and object columns, the narrow types need a fraction of the memory.
+        """
+        if "conf" in text.columns:
+            text = text[pandas.to_numeric(text["conf"], errors="coerce") >= 0]
+        return text.astype({_column: _dtype for _column, _dtype in TESSERACT_DTYPES.items() if _column in text.columns})
+
     def extract_text(self):
-        """Extracts text from the images using Tesseract OCR."""
-        if not self.image_files:
+        """Extracts text from the page images using Tesseract OCR, the pages are processed in parallel.
+
+        The in-memory images of extract_images are used, if there are none, the image files are read. If rendering
+        was skipped, the existing data files are read. The in-memory images are released after the extraction.
+        """
+        if self.page_images:
+            _pages = [(f"page_{i+1}", _image) for i, _image in enumerate(self.page_images)]
+        elif self.image_files:
+            _pages = [(_image_file.stem, _image_file) for _image_file in self.image_files]
+        else:
+            # the data files are fresh, see _is_rendered
+            _pages = [(f"page_{i+1}", None) for i in range(self._cached_pages)]
+        if not _pages:
             logging.warning(f"No images found for {self.pdf_file}. Skipping text extraction.")
             return
 
-        logging.debug("Extracting text from images for {self.pdf_file}")
-        for image_path in self.image_files:
-            try:
-                data_path = self.temp_dir / f"{image_path.stem}.csv"
-                if not self._is_overwrite(data_path):
-                    logging.info(f"using existing data {data_path}")
-                    text:pandas.DataFrame = pandas.read_csv(data_path, sep="\t")
-                else:
-                    with Image.open(image_path) as image:
-                        logging.debug(f"Extracting text as Dataframe from {image_path}")
-                        text:pandas.DataFrame = pytesseract.image_to_data(image, lang="deu", config="--dpi 200", output_type=pytesseract.Output.DATAFRAME)
-                        text.to_csv(data_path, sep="\t", index=False)
-                        logging.debug(f"Text extracted from image {image_path} to {data_path}")
+        logging.debug(f"Extracting text from images for {self.pdf_file}")
+        # tesseract runs as external process per page, so the threads are not bound by the GIL
+        with ThreadPoolExecutor(max_workers=min(len(_pages), self.ocr_threads)) as executor:
+            for result in executor.map(lambda _page: self._ocr_one(*_page), _pages):
+                if result is not None:
+                    data_path, text = result
+                    self.data.append(text)
+                    self.data_files.append(data_path)
+        self.page_images = []
+
+    def ranked_pages(self) -> List[pandas.DataFrame]:
+        """
+        Returns the pages worth classifying, the page with the highest mean word confidence first.
+
+        Pages with a mean word confidence below MIN_PAGE_CONF or less than MIN_PAGE_CHARS characters of text are
+        skipped, e.g. blank backsides of a scan. Pages without a conf column are ranked last. If no page passes, the
+        page with the highest mean word confidence is returned, so a poor scan is still classified with low quality.
+        """
+        _ranked = []
+        _all = []
+        for _page, text in enumerate(self.data):
+            if "conf" in text.columns:
+                _conf = pandas.to_numeric(text["conf"], errors="coerce")
+                # tesseract reports -1 for the layout rows, only words count
+                _mean_conf = _conf[_conf >= 0].mean()
+                # a page without words has no mean, it is the last choice
+                _all.append((_mean_conf if _mean_conf >= 0 else -1, _page))
+                if not _mean_conf >= MIN_PAGE_CONF:
+                    logging.info(f"skipping page {_page+1} of {self.pdf_file}, mean confidence {_mean_conf}")
+                    continue
+            else:
+                _mean_conf = -1
+                _all.append((_mean_conf, _page))
+            _chars = text["text"].dropna().astype(str).str.strip().str.len().sum() if "text" in text.columns else 0
+            if _chars < MIN_PAGE_CHARS:
+                logging.info(f"skipping page {_page+1} of {self.pdf_file}, only {_chars} characters of text")
+                continue
+            _ranked.append((_mean_conf, _page))
+        if not _ranked and _all:
+            logging.warning(f"no page of {self.pdf_file} passes the quality checks, using the most confident page")
+            _ranked = [max(_all, key=lambda r: r[0])]
+        # sorted is stable, pages with the same confidence keep their order
+        return [self.data[_page] for _, _page in sorted(_ranked, key=lambda r: -r[0])]
+
 
-                self.data.append(text)
-                self.data_files.append(data_path)
-            except Exception as e:
-                logging.error(f"Error extracting text from {image_path}: {e}")
+def default_workers() -> int:
+    """Number of worker processes for the PDF processing, can be set with the environment variable PDF_WORKERS.
+
+    Set PDF_WORKERS=1 to process the PDFs sequentially, e.g. if the PDFs are read from rotating media.
+    """
+    return int(os.environ.get("PDF_WORKERS", max(1, (os.cpu_count() or 1) - 1)))
 
 
 class PdfProcessor:
-    def __init__(self, temp_base_dir: Path = None, force:bool = False):
+    def __init__(self, temp_base_dir: Path = None, force:bool = False, workers: int = None, keep_images: bool = False):
         """
         :param temp_base_dir: the working folder
         :param force: if true, removes all existing files, otherwise, checks if the source file is newer than the target file and only reprocesses newer files
+        :param workers: the number of processes used to process PDFs in parallel, defaults to default_workers()
+        :param keep_images: if true, the page images are saved in the working folder
         """
 
         self.temp_base_dir = temp_base_dir or Path(tempfile.gettempdir()) / "pdf_processing"
         self.temp_base_dir.mkdir(parents=True, exist_ok=True)
         self.force = force
+        self.workers = workers or default_workers()
+        self.keep_images = keep_images
 
-    def process_pdf(self, pdf_file: Path) -> PdfData | None:
+    def process_pdf(self, pdf_file: Path, ocr_threads: int = None) -> PdfData | None:
         """Processes a single PDF file.
-        :param force: if true, removes all existing files, otherwise, checks if the source file is newer than the target file and only reprocesses newer files
+        :param pdf_file: the PDF file
+        :param ocr_threads: the number of pages OCRed in parallel, defaults to the number of CPUs
         """
         if not pdf_file.exists():
             logging.error(f"PDF file not found: {pdf_file}")
             return None
 
-        _pdf_data = PdfData(pdf_file, self.temp_base_dir, self.force)
+        logging.info(f"Processing PDF: {pdf_file}")
+        _pdf_data = PdfData(pdf_file, self.temp_base_dir, self.force, self.keep_images, ocr_threads)
         _pdf_data.extract_images()
         _pdf_data.extract_text()
 
@@ -136,10 +339,21 @@ class PdfProcessor:
         :returns: a list of PdfData objects
         """
         _pdf_files = list(pdf_folder.glob("*.pdf"))
+        _workers = min(self.workers, len(_pdf_files))
+        if _workers > 1:
+            # rasterization and OCR are CPU bound and run in external processes, so the PDFs are processed in parallel
+            logging.info(f"Processing {len(_pdf_files)} PDFs with {_workers} workers")
+            # every worker OCRs its pages with its share of the CPUs, otherwise workers times CPUs tesseract
+            # processes would compete for the CPUs
+            _ocr_threads = max(1, (os.cpu_count() or 1) // _workers)
+            # the bound method is pickled with the processor, which only holds paths and flags
+            with ProcessPoolExecutor(max_workers=_workers) as executor:
+                _results = list(executor.map(self.process_pdf, _pdf_files, repeat(_ocr_threads)))
+        else:
+            _results = [self.process_pdf(_pdf_file) for _pdf_file in _pdf_files]
+
         _pdf_data_list: List[PdfData] = []
-        for _pdf_file in _pdf_files:
-            logging.info(f"Processing PDF: {_pdf_file}")
-            _pdf_data = self.process_pdf(_pdf_file)
+        for _pdf_file, _pdf_data in zip(_pdf_files, _results):
             if _pdf_data is not None:
                 _pdf_data_list.append(_pdf_data)
             else:
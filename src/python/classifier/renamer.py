@@ -1,10 +1,25 @@
+import math
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
 
 from classifier.data import FileData
 
 """replacement character for invalid characters in filenames"""
 REPLACE_CHAR = "-"
+# number of distinct strings whose date check and conversion is memoized, dates repeat across many documents
+DATE_CACHE_SIZE = 4096
+
+# the supported date formats, the name of the matching group tells the format
+_DATE = re.compile(r"(?P<iso>\d{4}-\d{2}-\d{2})"
+                   r"|(?P<dot4>\d{2}\.\d{2}\.\d{4})"
+                   r"|(?P<dot2>\d{2}\.\d{2}\.\d{2})"
+                   r"|(?P<compact>\d{8})")
+# characters that are not allowed in filenames, replaced in one pass
+_INVALID_TABLE = str.maketrans({c: REPLACE_CHAR for c in '\\/*?:"<>|'})
+# runs of two or more REPLACE_CHARs, single ones are left alone
+_REPLACE_RUN = re.compile(rf"{re.escape(REPLACE_CHAR)}{{2,}}")
 
 """
 This module renames PDF documents based on metadata extracted from a CSV file.
@@ -21,21 +36,17 @@ def find_pdf_in(folder: Path) -> list[Path]:
         A list of Path objects, each representing a PDF file found in the folder.
         Returns an empty list if no PDF files are found.
     """
-    return list(folder.glob("*.pdf"))
+    # the directory entries carry the file type, no stat call and no pattern matching per file
+    with os.scandir(folder) as entries:
+        return [folder / entry.name for entry in entries if entry.name.endswith(".pdf") and entry.is_file()]
 
 
-def is_date_string(candidate) -> str:
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def is_date_string(candidate) -> bool:
     """checks if candidate is a date string, returns true if it is, false if not"""
-    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", candidate):
-        return True
-    if re.fullmatch(r"\d{2}\.\d{2}\.\d{4}", candidate):
-        return True
-    if re.fullmatch(r"\d{2}\.\d{2}\.\d{2}", candidate):
-        return True
-    if re.fullmatch(r"\d{4}\d{2}\d{2}", candidate):
-        return True
-    return False
+    return _DATE.fullmatch(candidate) is not None
 
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def sortable_date(datestr) -> str:
     """    Converts a date string to a sortable format (YYYY-MM-DD).
 
@@ -52,20 +63,20 @@ def sortable_date(datestr) -> str:
         The date string in YYYY-MM-DD format, or the original string if it's not a recognized date format.
     """
 
-    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", datestr):
+    match = _DATE.fullmatch(datestr)
+    if match is None:
         return datestr
-    if re.fullmatch(r"\d{2}\.\d{2}\.\d{4}", datestr):
+    if match.lastgroup == "iso":
+        return datestr
+    if match.lastgroup == "dot4":
         return datestr[6:10] + "-" + datestr[3:5] + "-" + datestr[0:2]
-
-    if re.fullmatch(r"\d{2}\.\d{2}\.\d{2}", datestr):
+    if match.lastgroup == "dot2":
         (year, month, day) = datestr.split(".")
         if int(month) > 12 : (month, day) = (day, month)
         if int(day) > 31 : (year, day) = (day, year)
         return f"20{year}-{month}-{day}"
-
-    if re.fullmatch(r"\d{4}\d{2}\d{2}", datestr):
-        return datestr[0:4] + "-" + datestr[4:6] + "-" + datestr[6:8]
-    return datestr
+    # compact
+    return datestr[0:4] + "-" + datestr[4:6] + "-" + datestr[6:8]
 
 def sanitize_string_for_filename(raw_filename: str) -> str:
     """
@@ -75,21 +86,24 @@ def sanitize_string_for_filename(raw_filename: str) -> str:
         raw_filename: The filename to sanitize.
 
     Returns:
-        The sanitized filename.
+        The sanitized filename, empty for a missing value.
     """
-    # check that raw_filename is actually a string or make it a string
-    if not isinstance(raw_filename, str):
-        raw_filename = str(raw_filename)
+    # a missing value of a DataFrame is NaN, str() would turn it into "nan"
+    if isinstance(raw_filename, float) and math.isnan(raw_filename):
+        return ""
+    sanitized = _replace_invalid_chars(raw_filename)
+    sanitized = sortable_date(sanitized) if is_date_string(sanitized) else sanitized
+
+    return sanitized
 
-    sanitized = re.sub(r'[\\/*?:"<>|]', REPLACE_CHAR, raw_filename)
+def _replace_invalid_chars(raw_filename: str) -> str:
+    """Replaces the invalid characters of a filename, the part of sanitize_string_for_filename without the dates."""
+    # make sure raw_filename is a string, str() returns a string argument unchanged
+    sanitized = str(raw_filename).translate(_INVALID_TABLE)
     # Remove leading/trailing spaces and dots and replacement chars
     sanitized = sanitized.strip(f" .{REPLACE_CHAR}")
     # Replace multiple REPLACE_CHARs with a single REPLACE_CHAR
-    sanitized = re.sub(rf"{REPLACE_CHAR}+", REPLACE_CHAR, sanitized)
-
-    sanitized = sortable_date(sanitized) if is_date_string(sanitized) else sanitized
-
-    return sanitized
+    return _REPLACE_RUN.sub(REPLACE_CHAR, sanitized)
 
 def classify_pdf(data: FileData, out_path : Path = None) -> Path | None:
     """
@@ -105,8 +119,10 @@ def classify_pdf(data: FileData, out_path : Path = None) -> Path | None:
     if not data.is_complete:
         return None
 
+    # one f-string builds the name in a single allocation. A whole filename is never a date, the date check would
+    # only fill the date caches with names that never repeat
     new_filename = f"{data.docdate}_{data.doctype}_{data.sendername}_{data.docid}_{data.receivername}_{data.dateoffile}.{data.extension}"
-    sanitized_filename = sanitize_string_for_filename(new_filename)
+    sanitized_filename = _replace_invalid_chars(new_filename)
     new_path = out_path / sanitized_filename if out_path is not None else Path(data.id).parent / sanitized_filename
     return new_path
 
@@ -119,11 +135,16 @@ def sanitize_filename_data(raw_filename_data: dict[str, FileData]) -> dict[str,
     Returns:
         The sanitized classification data.
     """
-    sanitized_data: dict[str, FileData] = {}
-    for key, value in raw_filename_data.items():
-        sanitized_data[key] = value.get_sanitized(sanitize_string_for_filename)
+    # the regular expressions hold the GIL, threads make this slower. Types, senders and extensions repeat across
+    # the documents, so every distinct string is sanitized only once
+    _sanitized: dict[str, str] = {}
+
+    def _sanitize(value: str) -> str:
+        if value not in _sanitized:
+            _sanitized[value] = sanitize_string_for_filename(value)
+        return _sanitized[value]
 
-    return sanitized_data
+    return {key: value.get_sanitized(_sanitize) for key, value in raw_filename_data.items()}
 
 if __name__ == "__main__":
     print("This is module - use the pdfclassify.py script as entry point")
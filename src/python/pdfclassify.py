@@ -15,6 +15,9 @@ logging.debug(os.environ.items())
 
 PROJECT_ROOT=Path(os.getenv("PROJECT_ROOT", "."))
 
+# the features of a page with a higher average quality are used without sending the other pages of the PDF to the LLM
+GOOD_ENOUGH_QUALITY = 0.95
+
 
 def parse_cmdline():
     """parses the commandline and identifies:
@@ -41,6 +44,8 @@ def parse_cmdline():
     parser.add_argument('--results-name', type=str, default='results.csv', help='Name of the results.csv file')
     parser.add_argument('--features', action='store_true', default=True, help='Write a features.csv file')
     parser.add_argument('--features-name-fmt', type=str, default='{pdf_name}-feature.csv', help='format string for the feature file, use {pdf_name} for the name of the accompanying pdf')
+    parser.add_argument('--keep-images', action='store_true', default=False, help='Keep the page images in the work folder')
+    parser.add_argument('--llm-cache', action='store_true', default=False, help='Cache the LLM responses in the work folder and reuse them for identical prompts')
     args = parser.parse_args()
     return args
 
@@ -67,49 +72,64 @@ def main():
     execute_copy = args.copy
     do_dry_run = args.dry_run
     do_force = args.force
+    keep_images = args.keep_images
+    llm_cache_dir = target_workdir / "llm_cache" if args.llm_cache else None
 
     if execute_move and execute_copy :
         logging.error("can either move or copy, not both, use --copy or --move, not both")
         exit(-1)
 # tag::main-method-init-llm[]
-    llm_c = LLMDataExtractor(api_key=os.getenv("GOOGLE_API_KEY"), model_name="gemini-2.0-flash-lite")
+    llm_c = LLMDataExtractor(api_key=os.getenv("GOOGLE_API_KEY"), model_name="gemini-2.0-flash-lite", cache_dir=llm_cache_dir,
+                             refresh_cache=do_force)
 # end::main-method-init-llm[]
 # tag::main-method-process-pdf[]
-    pdf_data_list = PdfProcessor(target_workdir, do_force).process_pdfs(pdf_path)
+    pdf_data_list = PdfProcessor(target_workdir, do_force, keep_images=keep_images).process_pdfs(pdf_path)
 # end::main-method-process-pdf[]
     features_list = []
+    _pending = []
 
-    _features_changed = False
     for pdf_data in pdf_data_list:
         logging.info(f"Found: {pdf_data.pdf_file.name}")
         _feature_name = features_name_fmt.format(pdf_name=pdf_data.pdf_file.name)
         _feature_path = target_base / _feature_name
 
         # use the existing feature file if it exists and is newer than the pdf file and not forced
-        if not do_force and _feature_path.exists() and os.path.getmtime(_feature_path) > os.path.getmtime(pdf_data.pdf_file):
+        try:
+            _is_fresh = not do_force and _feature_path.stat().st_mtime > pdf_data.mtime_of_pdf
+        except OSError:
+            _is_fresh = False
+        if _is_fresh:
             logging.info(f"Using existing features from {_feature_path}")
             _existing:pd.DataFrame = pd.read_csv(_feature_path, index_col=0)
             features_list.append(_existing)
             continue
 
-        _features_changed = True
+        _pending.append((pdf_data, _feature_path))
+
+    _features_changed = len(_pending) > 0
 
 # tag::main-method-loop-features[]
-        best_avg = 0.0
-        best = None
-        for data in pdf_data.data:
-            features = llm_c.extract_features(data)
+    # the most confident page of every PDF is sent to the LLM first, all PDFs in one batch. The other pages are only
+    # sent, again in one batch, for the PDFs where the first page did not reach GOOD_ENOUGH_QUALITY.
+    pages = [pdf_data.ranked_pages() for pdf_data, _ in _pending]
+    best_features = [None] * len(_pending)
+    best_avg = [0.0] * len(_pending)
+    jobs = [(i, pdf_pages[0]) for i, pdf_pages in enumerate(pages) if pdf_pages]
+    for _round in range(2):
+        for (i, _), features in zip(jobs, llm_c.extract_features_batch([data for _, data in jobs])):
             features_avg = features["quality"].mean()
-            if features_avg > best_avg :
-                best = features
-                best_avg = features_avg
+            if features_avg > best_avg[i] :
+                best_features[i] = features
+                best_avg[i] = features_avg
+        jobs = [(i, data) for i, pdf_pages in enumerate(pages) if best_avg[i] <= GOOD_ENOUGH_QUALITY for data in pdf_pages[1:]]
 # end::main-method-loop-features[]
 
+    for (pdf_data, _feature_path), best in zip(_pending, best_features):
         if best is not None:
-            pdf_id_row = pd.DataFrame({'key':['id'], 'value':[pdf_data.pdf_file.absolute()], 'quality':[1.0]})
-            pdf_id_row.set_index("key", inplace=True)
-            best.set_index("key", inplace=True)
-            best = pd.concat([pdf_id_row, best], ignore_index=False)
+            # the id row is put in front while the frame is built, a concat per PDF would copy the features again
+            best = pd.DataFrame({'value': [str(pdf_data.pdf_file.absolute()), *best["value"]],
+                                 'quality': [1.0, *best["quality"]]},
+                                index=pd.Index(['id', *best["key"]], name="key"))
             if write_features :
                 logging.info(f"Writing features to {_feature_path}")
                 best.to_csv(_feature_path, index=True)
@@ -117,12 +137,12 @@ def main():
 
     # writing features_list to features.csv next to input pdfs
     if write_features:
-        features_df = pd.concat(features_list)
         # Keep existing features compilation if they exist and are unchanged and not forced
         if not do_force and (target_base / "all-features.csv").exists() and not _features_changed:
             logging.info(f"Keeping existing features from {target_base / 'all-features.csv'}")
         else:
             logging.info(f"Writing features compilation to {target_base} / all-features.csv")
+            features_df = pd.concat(features_list, copy=False)
             features_df.to_csv(target_base / "all-features.csv", index=True, header=True)
 
 # tag::main-method-sanitize-data[]
@@ -131,7 +151,7 @@ def main():
 # end::main-method-sanitize-data[]
     if write_results :
         logging.info(f"Writing results to {results_file}")
-        sanitized_data_list = [vars(v) for v in sanitized_data.values()]
+        sanitized_data_list = [v.to_dict() for v in sanitized_data.values()]
         pd.DataFrame(sanitized_data_list,
                      columns = ['docdate', 'doctype', 'sendername', 'docid', 'receivername', 'dateoffile', 'extension', 'id']
                      ).to_csv(results_file, index=False)
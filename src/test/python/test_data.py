@@ -1,13 +1,12 @@
-import unittest
-from pathlib import Path
-from unittest.mock import patch
+from io import StringIO
 
 import pandas as pd
+import pytest
 
 from classifier.data import FileData, load_classification_data
 
 
-class TestFileData(unittest.TestCase):
+class TestFileData:
 
     def test_init_from_dict_complete(self):
         row = {
@@ -20,15 +19,15 @@ class TestFileData(unittest.TestCase):
             'extension': 'pdf'
         }
         file_data, is_complete = FileData().init_from_dict('test.pdf', row)
-        self.assertTrue(is_complete)
-        self.assertEqual(file_data.docdate, '2023-01-01')
-        self.assertEqual(file_data.doctype, 'invoice')
-        self.assertEqual(file_data.sendername, 'Test Sender')
-        self.assertEqual(file_data.docid, '123')
-        self.assertEqual(file_data.receivername, 'Test Receiver')
-        self.assertEqual(file_data.dateoffile, '2023-01-02')
-        self.assertEqual(file_data.extension, 'pdf')
-        self.assertEqual(file_data.id, 'test.pdf')
+        assert is_complete
+        assert file_data.docdate == '2023-01-01'
+        assert file_data.doctype == 'invoice'
+        assert file_data.sendername == 'Test Sender'
+        assert file_data.docid == '123'
+        assert file_data.receivername == 'Test Receiver'
+        assert file_data.dateoffile == '2023-01-02'
+        assert file_data.extension == 'pdf'
+        assert file_data.id == 'test.pdf'
 
     def test_init_from_dict_incomplete(self):
         row = {
@@ -41,15 +40,15 @@ class TestFileData(unittest.TestCase):
             'extension': 'pdf'
         }
         file_data, is_complete = FileData().init_from_dict('test.pdf', row)
-        self.assertFalse(is_complete)
-        self.assertEqual(file_data.docdate, '2023-01-01')
-        self.assertEqual(file_data.doctype, 'invoice')
-        self.assertEqual(file_data.sendername, 'Test Sender')
-        self.assertEqual(file_data.docid, '123')
-        self.assertIsNone(file_data.receivername)
-        self.assertEqual(file_data.dateoffile, '2023-01-02')
-        self.assertEqual(file_data.extension, 'pdf')
-        self.assertEqual(file_data.id, 'test.pdf')
+        assert not is_complete
+        assert file_data.docdate == '2023-01-01'
+        assert file_data.doctype == 'invoice'
+        assert file_data.sendername == 'Test Sender'
+        assert file_data.docid == '123'
+        assert file_data.receivername is None
+        assert file_data.dateoffile == '2023-01-02'
+        assert file_data.extension == 'pdf'
+        assert file_data.id == 'test.pdf'
 
     def test_get_sanitized(self):
         row = {
@@ -63,14 +62,36 @@ class TestFileData(unittest.TestCase):
         }
         file_data, _ = FileData().init_from_dict('test.pdf', row)
         sanitized_data = file_data.get_sanitized(lambda x: x.upper() if x is not None else None)
-        self.assertEqual(sanitized_data.docdate, '2023-01-01')
-        self.assertEqual(sanitized_data.doctype, 'INVOICE')
-        self.assertEqual(sanitized_data.sendername, 'TEST SENDER')
-        self.assertEqual(sanitized_data.docid, '123')
-        self.assertEqual(sanitized_data.receivername, 'TEST RECEIVER')
-        self.assertEqual(sanitized_data.dateoffile, '2023-01-02')
-        self.assertEqual(sanitized_data.extension, 'PDF')
-        self.assertEqual(sanitized_data.id, 'test.pdf')
+        assert sanitized_data.docdate == '2023-01-01'
+        assert sanitized_data.doctype == 'INVOICE'
+        assert sanitized_data.sendername == 'TEST SENDER'
+        assert sanitized_data.docid == '123'
+        assert sanitized_data.receivername == 'TEST RECEIVER'
+        assert sanitized_data.dateoffile == '2023-01-02'
+        assert sanitized_data.extension == 'PDF'
+        assert sanitized_data.id == 'test.pdf'
+
+    def test_from_row_missing_field(self):
+        row = pd.Series({'docdate': '2023-01-01', 'doctype': 'invoice', 'sendername': 'Test Sender', 'docid': '123',
+                         'receivername': pd.NA, 'dateoffile': '', 'extension': 'pdf'}, name='test.pdf', dtype="string")
+        file_data = FileData.from_row(row)
+        assert not file_data.is_complete
+        assert file_data.receivername is None
+        assert file_data.id == 'test.pdf'
+
+    def test_to_dict(self):
+        file_data, _ = FileData().init_from_dict('test.pdf', {'docdate': '2023-01-01'})
+        assert file_data.to_dict()['docdate'] == '2023-01-01'
+        assert file_data.to_dict()['id'] == 'test.pdf'
+        assert not file_data.to_dict()['is_complete']
+
+    def test_no_instance_dict(self):
+        file_data = FileData()
+        assert not hasattr(file_data, "__dict__")
+        assert not file_data.is_complete
+        assert file_data.docdate is None
+        with pytest.raises(AttributeError):
+            file_data.unknown = "x"
 
     def test_init_from_features(self):
         features = pd.DataFrame({
@@ -80,14 +101,24 @@ class TestFileData(unittest.TestCase):
         })
         features.set_index("key", inplace=True)
         file_data = FileData().init_from_features(features)
-        self.assertEqual(file_data.id, 'test.pdf')
-        self.assertEqual(file_data.docdate, '2023-01-01')
-        self.assertEqual(file_data.doctype, 'invoice[0.8]')
-        self.assertEqual(file_data.sendername, 'Test Sender')
-        self.assertEqual(file_data.docid, '123[0.7]')
-        self.assertEqual(file_data.receivername, '')
-        self.assertEqual(file_data.dateoffile, '')
-        self.assertEqual(file_data.extension, 'pdf')
+        assert file_data.id == 'test.pdf'
+        assert file_data.docdate == '2023-01-01'
+        assert file_data.doctype == 'invoice[0.8]'
+        assert file_data.sendername == 'Test Sender'
+        assert file_data.docid == '123[0.7]'
+        assert file_data.receivername == ''
+        assert file_data.dateoffile == ''
+        assert file_data.extension == 'pdf'
+
+    def test_init_from_features_keeps_features(self):
+        features = pd.DataFrame({
+            "key": ["id", "Document Date", "Document Type", "Sender", "Invoice Number"],
+            "value": ["test.pdf", "2023-01-01", "invoice", "Test Sender", "123"],
+            "quality": [1.0, 0.9, 0.8, 0.95, 0.7]
+        })
+        features.set_index("key", inplace=True)
+        FileData().init_from_features(features)
+        assert features.loc["Document Type", "value"] == "invoice"
 
     def test_init_from_features_missing_values(self):
         features = pd.DataFrame({
@@ -97,38 +128,67 @@ class TestFileData(unittest.TestCase):
         })
         features.set_index("key", inplace=True)
         file_data = FileData().init_from_features(features)
-        self.assertEqual(file_data.id, 'test.pdf')
-        self.assertEqual(file_data.docdate, 'unknown')
-        self.assertEqual(file_data.doctype, 'unknown[0.8]')
-        self.assertEqual(file_data.sendername, 'unknown')
-        self.assertEqual(file_data.docid, 'unknown[0.7]')
-        self.assertEqual(file_data.receivername, '')
-        self.assertEqual(file_data.dateoffile, '')
-        self.assertEqual(file_data.extension, 'pdf')
-
-
-class TestLoadClassificationData(unittest.TestCase):
-
-    @patch("builtins.open", new_callable=unittest.mock.mock_open,
-           read_data="scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\ntest.pdf,2023-01-01,invoice,Test Sender,123,Test Receiver,2023-01-02,pdf")
-    def test_load_classification_data_complete(self, mock_open):
-        data = load_classification_data(Path("test.csv"))
-        self.assertIn("test.pdf", data)
-        self.assertEqual(data["test.pdf"].docdate, "2023-01-01")
-        self.assertEqual(data["test.pdf"].doctype, "invoice")
-        self.assertEqual(data["test.pdf"].sendername, "Test Sender")
-        self.assertEqual(data["test.pdf"].docid, "123")
-        self.assertEqual(data["test.pdf"].receivername, "Test Receiver")
-        self.assertEqual(data["test.pdf"].dateoffile, "2023-01-02")
-        self.assertEqual(data["test.pdf"].extension, "pdf")
-
-    @patch("builtins.open", new_callable=unittest.mock.mock_open,
-           # this read_data result misses one column in the middle and so one field is None.
-           read_data="scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\ntest.pdf,2023-01-01,invoice,Test Sender,123,2023-01-02,pdf")
-    def test_load_classification_data_incomplete(self, mock_open):
-        data = load_classification_data(Path("test.csv"))
-        self.assertNotIn("test.pdf", data)
+        assert file_data.id == 'test.pdf'
+        assert file_data.docdate == 'unknown'
+        assert file_data.doctype == 'unknown[0.8]'
+        assert file_data.sendername == 'unknown'
+        assert file_data.docid == 'unknown[0.7]'
+        assert file_data.receivername == ''
+        assert file_data.dateoffile == ''
+        assert file_data.extension == 'pdf'
+
+
+class TestLoadClassificationData:
+
+    def test_load_classification_data_complete(self):
+        data = load_classification_data(StringIO(
+            "scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\ntest.pdf,2023-01-01,invoice,Test Sender,123,Test Receiver,2023-01-02,pdf"))
+        assert "test.pdf" in data.index
+        assert data.loc["test.pdf", "docdate"] == "2023-01-01"
+        assert data.loc["test.pdf", "doctype"] == "invoice"
+        assert data.loc["test.pdf", "sendername"] == "Test Sender"
+        assert data.loc["test.pdf", "docid"] == "123"
+        assert data.loc["test.pdf", "receivername"] == "Test Receiver"
+        assert data.loc["test.pdf", "dateoffile"] == "2023-01-02"
+        assert data.loc["test.pdf", "extension"] == "pdf"
+
+    def test_load_classification_data_incomplete(self):
+        # this row misses one column in the middle and so one field is None.
+        data = load_classification_data(StringIO(
+            "scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\ntest.pdf,2023-01-01,invoice,Test Sender,123,2023-01-02,pdf"))
+        assert "test.pdf" not in data.index
+
+    def test_load_classification_data_empty_optional_fields(self):
+        data = load_classification_data(StringIO(
+            "scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\n"
+            "test.pdf,2023-01-01,invoice,Test Sender,123,,,pdf\n"
+            "other.pdf,2023-01-01,,Test Sender,123,,,pdf"))
+        assert "test.pdf" in data.index
+        assert data.loc["test.pdf", "receivername"] == ""
+        assert "other.pdf" not in data.index
+
+    def test_load_classification_data_empty_required_field(self):
+        # a blank docid or sender would leave an empty part in the new file name
+        data = load_classification_data(StringIO(
+            "scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\n"
+            "test.pdf,2023-01-01,invoice,Test Sender,,Test Receiver,2023-01-02,pdf\n"
+            "other.pdf,2023-01-01,invoice,,123,Test Receiver,2023-01-02,pdf"))
+        assert data.empty
+
+    def test_load_classification_data_from_row(self):
+        data = load_classification_data(StringIO(
+            "scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\ntest.pdf,2023-01-01,invoice,Test Sender,123,,,pdf"))
+        file_data = FileData.from_row(data.loc["test.pdf"])
+        assert file_data.is_complete
+        assert file_data.id == "test.pdf"
+        assert file_data.sendername == "Test Sender"
+        assert file_data.receivername == ""
+
+    def test_load_classification_data_header_only(self):
+        data = load_classification_data(StringIO("scanfile,docdate,doctype,sendername,docid,receivername,dateoffile,extension\n"))
+        assert data.empty
+        assert list(data.columns) == ["docdate", "doctype", "sendername", "docid", "receivername", "dateoffile", "extension"]
 
 
 if __name__ == '__main__':
-    unittest.main()
+    raise SystemExit(pytest.main([__file__]))
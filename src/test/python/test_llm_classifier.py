@@ -1,131 +1,393 @@
+import asyncio
+import copy
 import os
-import unittest
-from unittest.mock import patch, MagicMock
+from collections import OrderedDict
+from unittest.mock import patch, MagicMock, AsyncMock
 
 import pandas as pd
+import pytest
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
 
-from classifier.llm_classifier import LLMDataExtractor
+from classifier.llm_classifier import LLMDataExtractor, RateLimiter, MAX_OUTPUT_TOKENS, REQUEST_TIMEOUT_SECONDS
 
 
-class TestLLMDataExtractor(unittest.TestCase):
+class LoopBoundModel:
+    """Like the async client of the SDK, the model only works on the event loop of its first call."""
 
-    @patch.dict(os.environ, {"GOOGLE_API_KEY": "test_api_key"})
-    def setUp(self):
-        self.extractor = LLMDataExtractor()
-        self.mock_model = MagicMock()
-        self.extractor.model = self.mock_model
+    def __init__(self):
+        self.loop = None
+
+    async def generate_content_async(self, prompt, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        if loop is not self.loop:
+            raise RuntimeError("Event loop is closed")
+        response = MagicMock()
+        response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        return response
+
+
+@pytest.fixture(scope="module")
+def template_extractor() -> LLMDataExtractor:
+    """The extractor is created once, every test works on a shallow copy with its own model and limiter."""
+    with patch.dict(os.environ, {"GOOGLE_API_KEY": "test_api_key"}):
+        return LLMDataExtractor()
+
+
+@pytest.fixture(autouse=True)
+def mock_sleep() -> AsyncMock:
+    """The retries and the rate limiter never wait for real."""
+    with patch("classifier.llm_classifier.asyncio.sleep", new_callable=AsyncMock) as _sleep:
+        yield _sleep
+
+
+@pytest.fixture
+def mock_model() -> MagicMock:
+    _model = MagicMock()
+    _model.generate_content_async = AsyncMock()
+    return _model
+
+
+@pytest.fixture
+def extractor(template_extractor, mock_model) -> LLMDataExtractor:
+    _extractor = copy.copy(template_extractor)
+    _extractor.limiter = RateLimiter()
+    _extractor._memo = OrderedDict()
+    _extractor.model = mock_model
+    return _extractor
+
+
+class TestLLMDataExtractor:
 
     def test_init_with_api_key(self):
         extractor = LLMDataExtractor(api_key="test_api_key")
-        self.assertIsNotNone(extractor.model)
+        assert extractor.model is not None
 
     def test_init_without_api_key(self):
         with patch.dict(os.environ, {"GOOGLE_API_KEY": "test_api_key"}):
             extractor = LLMDataExtractor()
-            self.assertIsNotNone(extractor.model)
+            assert extractor.model is not None
+
+    @patch.dict("classifier.llm_classifier._model_cache", clear=True)
+    @patch("classifier.llm_classifier.genai.GenerativeModel")
+    def test_init_reuses_model(self, mock_generative_model):
+        first = LLMDataExtractor(api_key="test_api_key")
+        second = LLMDataExtractor(api_key="test_api_key")
+        other = LLMDataExtractor(api_key="test_api_key", model_name="other-model")
+        assert first.model is second.model
+        assert mock_generative_model.call_count == 2
+        assert mock_generative_model.call_args.args == ("other-model",)
 
     def test_init_no_api_key_raises_error(self):
         with patch.dict(os.environ, {}, clear=True):
-            with self.assertRaises(ValueError):
+            with pytest.raises(ValueError):
                 LLMDataExtractor()
 
-    def test_extract_features_empty_df(self):
+    def test_extract_features_empty_df(self, extractor):
         empty_df = pd.DataFrame()
-        result_df = self.extractor.extract_features(empty_df)
-        self.assertTrue(result_df.empty)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
+        result_df = extractor.extract_features(empty_df)
+        assert result_df.empty
+        assert list(result_df.columns) == ["key", "value", "quality"]
 
-    def test_extract_features_api_call_success(self):
+    def test_extract_features_api_call_success(self, extractor, mock_model):
         mock_response = MagicMock()
         mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
-        self.mock_model.generate_content.return_value = mock_response
+        mock_model.generate_content_async.return_value = mock_response
         mock_response.resolve.return_value = None
         test_df = pd.DataFrame({"text": ["some", "text"]})
-        result_df = self.extractor.extract_features(test_df)
-        self.assertFalse(result_df.empty)
-        self.assertEqual(len(result_df), 4)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
-        self.assertEqual(result_df.loc[0, "key"], "Document Date")
-        self.assertEqual(result_df.loc[0, "value"], "2023-01-15")
-        self.assertEqual(result_df.loc[0, "quality"], 0.9)
-        self.assertEqual(result_df.loc[1, "key"], "Document Type")
-        self.assertEqual(result_df.loc[1, "value"], "Rechnung")
-        self.assertEqual(result_df.loc[1, "quality"], 0.8)
-        self.assertEqual(result_df.loc[2, "key"], "Sender")
-        self.assertEqual(result_df.loc[2, "value"], "Test-GmbH")
-        self.assertEqual(result_df.loc[2, "quality"], 0.95)
-        self.assertEqual(result_df.loc[3, "key"], "Invoice Number")
-        self.assertEqual(result_df.loc[3, "value"], "12345")
-        self.assertEqual(result_df.loc[3, "quality"], 0.7)
-
-    def test_extract_features_api_call_failure(self):
-        self.mock_model.generate_content.side_effect = Exception("API Error")
+        result_df = extractor.extract_features(test_df)
+        assert not result_df.empty
+        assert len(result_df) == 4
+        assert list(result_df.columns) == ["key", "value", "quality"]
+        assert result_df.loc[0, "key"] == "Document Date"
+        assert result_df.loc[0, "value"] == "2023-01-15"
+        assert result_df.loc[0, "quality"] == 0.9
+        assert result_df.loc[1, "key"] == "Document Type"
+        assert result_df.loc[1, "value"] == "Rechnung"
+        assert result_df.loc[1, "quality"] == 0.8
+        assert result_df.loc[2, "key"] == "Sender"
+        assert result_df.loc[2, "value"] == "Test-GmbH"
+        assert result_df.loc[2, "quality"] == 0.95
+        assert result_df.loc[3, "key"] == "Invoice Number"
+        assert result_df.loc[3, "value"] == "12345"
+        assert result_df.loc[3, "quality"] == 0.7
+
+    def test_extract_features_api_call_failure(self, extractor, mock_model):
+        mock_model.generate_content_async.side_effect = Exception("API Error")
         test_df = pd.DataFrame({"text": ["some", "text"]})
-        result_df = self.extractor.extract_features(test_df)
-        self.assertTrue(result_df.empty)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
+        result_df = extractor.extract_features(test_df)
+        assert result_df.empty
+        assert list(result_df.columns) == ["key", "value", "quality"]
+
+    def test_extract_features_rate_limit_retry(self, extractor, mock_model, mock_sleep):
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        mock_model.generate_content_async.side_effect = [ResourceExhausted("429"), mock_response]
+        result_df = extractor.extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        assert len(result_df) == 4
+        assert mock_model.generate_content_async.call_count == 2
+        mock_sleep.assert_called_once()
+
+    def test_extract_features_timeout_retries_exhausted(self, extractor, mock_model, mock_sleep):
+        mock_model.generate_content_async.side_effect = DeadlineExceeded("timeout")
+        result_df = extractor.extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        assert result_df.empty
+        assert mock_model.generate_content_async.call_count == 3
+        assert mock_sleep.call_count == 2
+
+    def test_extract_features_batch(self, extractor, mock_model):
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        mock_model.generate_content_async = AsyncMock(side_effect=[mock_response, Exception("API Error")])
+        result_dfs = extractor.extract_features_batch([
+            pd.DataFrame({"text": ["some", "text"]}),
+            pd.DataFrame(),
+            pd.DataFrame({"text": ["other", "text"]}),
+        ])
+        assert len(result_dfs) == 3
+        assert len(result_dfs[0]) == 4
+        assert result_dfs[1].empty
+        assert result_dfs[2].empty
+        assert mock_model.generate_content_async.await_count == 2
+
+    def test_extract_features_call_options(self, extractor, mock_model):
+        mock_model.generate_content_async.return_value.text = "{}"
+        extractor.extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        kwargs = mock_model.generate_content_async.call_args.kwargs
+        # the SDK must not retry on its own, its retries are not bound by the timeout
+        assert {"timeout": REQUEST_TIMEOUT_SECONDS, "retry": None} == kwargs["request_options"]
+        assert "application/json" == kwargs["generation_config"].response_mime_type
+        assert MAX_OUTPUT_TOKENS == kwargs["generation_config"].max_output_tokens
+
+    def test_extract_features_batch_call_options(self, extractor, mock_model):
+        mock_response = MagicMock()
+        mock_response.text = "{}"
+        mock_model.generate_content_async = AsyncMock(return_value=mock_response)
+        extractor.extract_features_batch([pd.DataFrame({"text": ["some", "text"]})])
+        kwargs = mock_model.generate_content_async.call_args.kwargs
+        assert {"timeout": REQUEST_TIMEOUT_SECONDS, "retry": None} == kwargs["request_options"]
+        assert "application/json" == kwargs["generation_config"].response_mime_type
+        assert MAX_OUTPUT_TOKENS == kwargs["generation_config"].max_output_tokens
 
-    def test_parse_response_invalid_response(self):
+    def test_extract_features_batch_rate_limit_retry(self, extractor, mock_model, mock_sleep):
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        mock_model.generate_content_async = AsyncMock(side_effect=[ResourceExhausted("429"), mock_response])
+        result_dfs = extractor.extract_features_batch([pd.DataFrame({"text": ["some", "text"]})])
+        assert len(result_dfs[0]) == 4
+        mock_sleep.assert_called_once()
+
+    @patch("classifier.llm_classifier._build_model")
+    def test_extract_features_batch_twice(self, mock_build_model):
+        mock_build_model.return_value = LoopBoundModel()
+        extractor = LLMDataExtractor(api_key="test_api_key")
+        for text in ("first", "second"):
+            result_dfs = extractor.extract_features_batch([pd.DataFrame({"text": [text]})])
+            assert len(result_dfs[0]) == 4
+
+    def test_extract_features_batch_same_pages(self, extractor, mock_model):
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        mock_model.generate_content_async = AsyncMock(return_value=mock_response)
+        result_dfs = extractor.extract_features_batch([pd.DataFrame({"text": ["some", "text"]})] * 3)
+        assert len(result_dfs) == 3
+        assert all(len(result_df) == 4 for result_df in result_dfs)
+        assert result_dfs[0] is not result_dfs[1]
+        assert mock_model.generate_content_async.await_count == 1
+
+    def test_extract_features_memo(self, extractor, mock_model):
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        mock_model.generate_content_async.return_value = mock_response
+        test_df = pd.DataFrame({"text": ["some", "text"]})
+        first_df = extractor.extract_features(test_df)
+        second_df = extractor.extract_features(test_df)
+        mock_model.generate_content_async.assert_called_once()
+        pd.testing.assert_frame_equal(first_df, second_df)
+
+    def test_extract_features_cached(self, extractor, mock_model, tmp_path):
+        extractor.cache_dir = tmp_path
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 012345 (0.7)"
+        mock_model.generate_content_async.return_value = mock_response
+        test_df = pd.DataFrame({"text": ["some", "text"]})
+        first_df = extractor.extract_features(test_df)
+        # the second call reads the cache file instead of the memo
+        extractor._memo.clear()
+        second_df = extractor.extract_features(test_df)
+        mock_model.generate_content_async.assert_called_once()
+        assert len(list(tmp_path.glob("*.csv"))) == 1
+        pd.testing.assert_frame_equal(first_df, second_df)
+
+    def test_extract_features_cached_normalized(self, extractor, mock_model, tmp_path):
+        extractor.cache_dir = tmp_path
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        mock_model.generate_content_async.return_value = mock_response
+        extractor.extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        extractor.extract_features(pd.DataFrame({"text": ["some  text"]}))
+        mock_model.generate_content_async.assert_called_once()
+
+    @patch("classifier.llm_classifier._build_model")
+    def test_extract_features_cached_other_model(self, mock_build_model, mock_model, tmp_path):
+        mock_build_model.return_value = mock_model
+        mock_model.generate_content_async.return_value.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        LLMDataExtractor(api_key="test_api_key", cache_dir=tmp_path).extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        other = LLMDataExtractor(api_key="test_api_key", model_name="other-model", cache_dir=tmp_path)
+        other.extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        assert mock_model.generate_content_async.call_count == 2
+        assert len(list(tmp_path.glob("*.csv"))) == 2
+
+    def test_extract_features_refresh_cache(self, extractor, mock_model, tmp_path):
+        extractor.cache_dir = tmp_path
+        mock_model.generate_content_async.return_value.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
+        extractor.extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        extractor._memo.clear()
+        extractor.refresh_cache = True
+        extractor.extract_features(pd.DataFrame({"text": ["some", "text"]}))
+        assert mock_model.generate_content_async.call_count == 2
+        assert len(list(tmp_path.glob("*.csv"))) == 1
+
+    def test_extract_features_cached_case_sensitive(self, extractor, mock_model, tmp_path):
+        extractor.cache_dir = tmp_path
+        mock_response = MagicMock()
+        mock_response.text = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: AB12 (0.7)"
+        mock_model.generate_content_async.return_value = mock_response
+        extractor.extract_features(pd.DataFrame({"text": ["Invoice", "AB12"]}))
+        extractor.extract_features(pd.DataFrame({"text": ["Invoice", "ab12"]}))
+        assert mock_model.generate_content_async.call_count == 2
+
+    def test_parse_response_invalid_response(self, extractor):
         invalid_response = "This is not a valid response"
-        result_df = self.extractor._parse_response(invalid_response)
-        self.assertFalse(result_df.empty)
-        self.assertEqual(len(result_df), 4)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
-        self.assertListEqual(list(result_df["quality"]), [0.1, 0.1, 0.1, 0.1])
+        result_df = extractor._parse_response(invalid_response)
+        assert not result_df.empty
+        assert len(result_df) == 4
+        assert list(result_df.columns) == ["key", "value", "quality"]
+        assert list(result_df["quality"]) == [0.1, 0.1, 0.1, 0.1]
 
-    def test_parse_response_valid_response(self):
+    def test_parse_response_valid_response(self, extractor):
         valid_response = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
-        result_df = self.extractor._parse_response(valid_response)
-        self.assertFalse(result_df.empty)
-        self.assertEqual(len(result_df), 4)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
-        self.assertEqual(result_df.loc[0, "key"], "Document Date")
-        self.assertEqual(result_df.loc[0, "value"], "2023-01-15")
-        self.assertEqual(result_df.loc[0, "quality"], 0.9)
-        self.assertEqual(result_df.loc[1, "key"], "Document Type")
-        self.assertEqual(result_df.loc[1, "value"], "Rechnung")
-        self.assertEqual(result_df.loc[1, "quality"], 0.8)
-        self.assertEqual(result_df.loc[2, "key"], "Sender")
-        self.assertEqual(result_df.loc[2, "value"], "Test-GmbH")
-        self.assertEqual(result_df.loc[2, "quality"], 0.95)
-        self.assertEqual(result_df.loc[3, "key"], "Invoice Number")
-        self.assertEqual(result_df.loc[3, "value"], "12345")
-        self.assertEqual(result_df.loc[3, "quality"], 0.7)
-
-    def test_parse_response_invalid_quality(self):
+        result_df = extractor._parse_response(valid_response)
+        assert not result_df.empty
+        assert len(result_df) == 4
+        assert list(result_df.columns) == ["key", "value", "quality"]
+        assert result_df.loc[0, "key"] == "Document Date"
+        assert result_df.loc[0, "value"] == "2023-01-15"
+        assert result_df.loc[0, "quality"] == 0.9
+        assert result_df.loc[1, "key"] == "Document Type"
+        assert result_df.loc[1, "value"] == "Rechnung"
+        assert result_df.loc[1, "quality"] == 0.8
+        assert result_df.loc[2, "key"] == "Sender"
+        assert result_df.loc[2, "value"] == "Test-GmbH"
+        assert result_df.loc[2, "quality"] == 0.95
+        assert result_df.loc[3, "key"] == "Invoice Number"
+        assert result_df.loc[3, "value"] == "12345"
+        assert result_df.loc[3, "quality"] == 0.7
+
+    def test_parse_response_json(self, extractor):
+        json_response = ('{"Document Date": {"value": "2023-01-15", "quality": 0.9}, "Document Type": {"value": "Rechnung", "quality": 0.8}, '
+                         '"Sender": {"value": "Test GmbH", "quality": 0.95}, "Invoice Number": {"value": "", "quality": 0.7}}')
+        result_df = extractor._parse_response(json_response)
+        assert list(result_df.columns) == ["key", "value", "quality"]
+        assert result_df["key"].tolist() == ["Document Date", "Document Type", "Sender", "Invoice Number"]
+        assert result_df["value"].tolist() == ["2023-01-15", "Rechnung", "Test-GmbH", ""]
+        assert result_df["quality"].tolist() == [0.9, 0.8, 0.95, 0.7]
+
+    def test_parse_response_json_missing_key(self, extractor):
+        json_response = '{"Document Date": {"value": "2023-01-15", "quality": 0.9}, "Sender": {"value": "Test GmbH", "quality": 0.95}}'
+        result_df = extractor._parse_response(json_response)
+        assert len(result_df) == 4
+        assert (result_df["value"] == "").all()
+        assert (result_df["quality"] == 0.1).all()
+
+    def test_parse_response_invalid_quality(self, extractor):
         valid_response = "Document Date: 2023-01-15 (abc)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)"
-        result_df = self.extractor._parse_response(valid_response)
-        self.assertFalse(result_df.empty)
-        self.assertEqual(len(result_df), 4)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
-        self.assertEqual(result_df.loc[0, "key"], "Document Date")
-        self.assertEqual(result_df.loc[0, "value"], "")
-        self.assertEqual(result_df.loc[0, "quality"], 0.1)
-
-    def test_parse_response_invalid_key(self):
+        result_df = extractor._parse_response(valid_response)
+        assert not result_df.empty
+        assert len(result_df) == 4
+        assert list(result_df.columns) == ["key", "value", "quality"]
+        assert result_df.loc[0, "key"] == "Document Date"
+        assert result_df.loc[0, "value"] == ""
+        assert result_df.loc[0, "quality"] == 0.1
+
+    def test_parse_response_invalid_key(self, extractor):
         valid_response = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnung (0.8)\nSender: Test GmbH (0.95)\nInvoice Number: 12345 (0.7)\nInvalid Key: Invalid Value (0.5)"
-        result_df = self.extractor._parse_response(valid_response)
-        self.assertFalse(result_df.empty)
-        self.assertEqual(len(result_df), 4)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
+        result_df = extractor._parse_response(valid_response)
+        assert not result_df.empty
+        assert len(result_df) == 4
+        assert list(result_df.columns) == ["key", "value", "quality"]
 
-    def test_parse_response_invalid_value(self):
+    def test_parse_response_invalid_value(self, extractor):
         valid_response = "Document Date: 2023-01-15 (0.9)\nDocument Type: Rechnu(ng (0.8)\nSender: Test G mbH (0.95)\nInvoice Number: 12345 (0.7)"
-        result_df = self.extractor._parse_response(valid_response)
-        self.assertFalse(result_df.empty)
-        self.assertEqual(len(result_df), 4)
-        self.assertListEqual(list(result_df.columns), ["key", "value", "quality"])
-        self.assertEqual(result_df.loc[1, "value"], "")
-        self.assertEqual(result_df.loc[2, "value"], "")
-
-    def test_create_prompt(self):
+        result_df = extractor._parse_response(valid_response)
+        assert not result_df.empty
+        assert len(result_df) == 4
+        assert list(result_df.columns) == ["key", "value", "quality"]
+        assert result_df.loc[1, "value"] == ""
+        assert result_df.loc[2, "value"] == ""
+
+    def test_create_prompt(self, extractor):
         test_df = pd.DataFrame({"text": ["some", "text"]})
-        prompt = self.extractor._create_prompt(test_df)
-        self.assertIn("You are a document processing expert", prompt)
-        self.assertIn("Here is the document text:", prompt)
-        self.assertIn("some", prompt)
-        self.assertIn("text", prompt)
+        prompt = extractor._create_prompt(test_df)
+        assert "You are a document processing expert" in prompt
+        assert "Here is the document text:" in prompt
+        assert "some" in prompt
+        assert "text" in prompt
+
+    def test_create_prompt_filters_and_sorts(self, extractor):
+        test_df = pd.DataFrame({
+            "page_num": [1, 1, 1, 1],
+            "block_num": [2, 2, 1, 1],
+            "par_num": [1, 1, 1, 1],
+            "line_num": [1, 1, 1, 1],
+            "top": [500, 502, 10, 12],
+            "conf": [90, 95, 96, 10],
+            "text": ["footer", "text", "header", "noise"],
+        })
+        text_content = extractor._text_content(test_df)
+        assert "header\nfooter\ntext" == text_content
+
+    @patch("classifier.llm_classifier.MAX_OCR_CHARS", 20)
+    def test_create_prompt_truncates(self, extractor):
+        test_df = pd.DataFrame({"text": ["word"] * 100})
+        text_content = extractor._text_content(test_df)
+        assert "\n".join(["word"] * 4) == text_content
+
+
+class TestRateLimiter:
+
+    def test_reserve_within_limits(self):
+        limiter = RateLimiter(rpm=2, tpm=1000)
+        assert limiter._reserve(100) == 0.0
+        assert limiter._reserve(100) == 0.0
+
+    def test_reserve_exceeds_rpm(self):
+        limiter = RateLimiter(rpm=2, tpm=1000)
+        limiter._reserve(100)
+        limiter._reserve(100)
+        assert limiter._reserve(100) > 0.0
+
+    def test_reserve_exceeds_tpm(self):
+        limiter = RateLimiter(rpm=10, tpm=1000)
+        assert limiter._reserve(600) == 0.0
+        assert limiter._reserve(600) > 0.0
+
+    def test_reserve_large_call_in_empty_window(self):
+        limiter = RateLimiter(rpm=10, tpm=1000)
+        assert limiter._reserve(5000) == 0.0
+
+    def test_aimd(self):
+        limiter = RateLimiter(rpm=60, tpm=1000)
+        limiter.on_rate_limited()
+        assert limiter.rpm == 30
+        for _ in range(RateLimiter.SUCCESSES_TO_INCREASE):
+            limiter.on_success()
+        assert limiter.rpm == 36
+        for _ in range(10 * RateLimiter.SUCCESSES_TO_INCREASE):
+            limiter.on_success()
+        assert limiter.rpm == 60
 
 
 if __name__ == '__main__':
-    unittest.main()
+    raise SystemExit(pytest.main([__file__]))
@@ -1,153 +1,356 @@
+import os
 import shutil
-import tempfile
-import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from unittest.mock import patch, MagicMock, PropertyMock
+from unittest.mock import patch, MagicMock
 
 import pandas as pd
+import pytesseract
+import pytest
+from PIL import Image
 
 from classifier.pdfprocessor import PdfProcessor, PdfData
 
+RESOURCES = Path(__file__).parent.parent / "resources"
 
-class TestPdfData(unittest.TestCase):
-    def setUp(self):
-        self.temp_base_dir = Path(tempfile.mkdtemp())
-        self.pdf_file = self.temp_base_dir / "test.pdf"
-        with open(self.pdf_file, "w") as f:
-            f.write("dummy pdf content")
-        self.pdf_data = PdfData(self.pdf_file, self.temp_base_dir)
 
-    def tearDown(self):
-        shutil.rmtree(self.temp_base_dir)
+@pytest.fixture(scope="module")
+def base_dir(tmp_path_factory) -> Path:
+    return tmp_path_factory.mktemp("pdf")
 
-    def test_init(self):
-        self.assertTrue(self.pdf_data.temp_dir.exists())
-        self.assertEqual(self.pdf_data.pdf_file, self.pdf_file)
-        self.assertEqual(self.pdf_data.image_files, [])
-        self.assertEqual(self.pdf_data.data_files, [])
-        self.assertEqual(self.pdf_data.data, [])
 
-    def test_init_existing_temp_dir(self):
+@pytest.fixture
+def temp_base_dir(base_dir, request) -> Path:
+    """A folder of the test below the shared folder of the module."""
+    _dir = base_dir / f"{request.cls.__name__}.{request.node.name}"
+    _dir.mkdir()
+    return _dir
+
+
+@pytest.fixture(scope="module")
+def fake_tesseract(tmp_path_factory) -> Path:
+    """A tesseract that finds one word on every page, found by the worker processes through the PATH."""
+    _bin_dir = tmp_path_factory.mktemp("bin")
+    _tesseract = _bin_dir / "tesseract"
+    _tesseract.write_text('#!/bin/sh\n'
+                          'if [ "$1" = "--version" ]; then echo "tesseract 5.3.0"; exit 0; fi\n'
+                          'printf "level\\tpage_num\\tblock_num\\tpar_num\\tline_num\\tword_num\\tleft\\ttop\\twidth\\theight\\tconf\\ttext\\n'
+                          '5\\t1\\t1\\t1\\t1\\t1\\t10\\t10\\t80\\t20\\t96.5\\tRechnung\\n" > "$2.tsv"\n')
+    _tesseract.chmod(0o755)
+    return _bin_dir
+
+
+@pytest.fixture
+def pdf_file() -> Path:
+    """The PDF is never read by the tests, a mock spares writing a file."""
+    _pdf_file = MagicMock(spec=Path)
+    _pdf_file.exists.return_value = True
+    _pdf_file.name = "test.pdf"
+    _pdf_file.stem = "test"
+    _pdf_file.suffix = ".pdf"
+    _pdf_file.stat.return_value.st_mtime = 0.0
+    _pdf_file.stat.return_value.st_mtime_ns = 0
+    _pdf_file.stat.return_value.st_size = 17
+    return _pdf_file
+
+
+@pytest.fixture
+def pdf_data(pdf_file, temp_base_dir) -> PdfData:
+    return PdfData(pdf_file, temp_base_dir)
+
+
+class TestPdfData:
+    def test_init(self, pdf_data, pdf_file):
+        assert pdf_data.temp_dir.exists()
+        assert pdf_data.pdf_file == pdf_file
+        assert pdf_data.image_files == []
+        assert pdf_data.data_files == []
+        assert pdf_data.data == []
+
+    def test_init_existing_temp_dir(self, pdf_data, pdf_file, temp_base_dir):
         # Create an existing temp dir
-        self.pdf_data.temp_dir.mkdir(parents=True, exist_ok=True)
+        pdf_data.temp_dir.mkdir(parents=True, exist_ok=True)
         # Create a file in the temp dir to check if it gets removed
-        (self.pdf_data.temp_dir / "dummy.txt").touch()
+        (pdf_data.temp_dir / "dummy.txt").touch()
         # Create a new PdfData object
-        pdf_data = PdfData(self.pdf_file, self.temp_base_dir, force=True)
-        self.assertTrue(pdf_data.temp_dir.exists())
-        self.assertFalse((pdf_data.temp_dir / "dummy.txt").exists())
+        pdf_data = PdfData(pdf_file, temp_base_dir, force=True)
+        assert pdf_data.temp_dir.exists()
+        assert not (pdf_data.temp_dir / "dummy.txt").exists()
+
+    def test_cleanup(self, pdf_data):
+        pdf_data.temp_dir.mkdir(parents=True, exist_ok=True)
+        (pdf_data.temp_dir / "dummy.txt").touch()
+        pdf_data.cleanup()
+        assert not pdf_data.temp_dir.exists()
 
-    def test_cleanup(self):
-        self.pdf_data.temp_dir.mkdir(parents=True, exist_ok=True)
-        (self.pdf_data.temp_dir / "dummy.txt").touch()
-        self.pdf_data.cleanup()
-        self.assertFalse(self.pdf_data.temp_dir.exists())
+    @patch("classifier.pdfprocessor.pymupdf", None)
+    @patch("classifier.pdfprocessor.convert_from_path")
+    def test_extract_images(self, mock_convert_from_path, pdf_data):
+        mock_image = MagicMock()
+        mock_convert_from_path.return_value = [mock_image]
+        pdf_data.extract_images()
+        assert pdf_data.page_images == [mock_image]
+        assert len(pdf_data.image_files) == 0
+        mock_image.save.assert_not_called()
+        assert mock_convert_from_path.call_args.kwargs["grayscale"]
 
+    @patch("classifier.pdfprocessor.pymupdf", None)
     @patch("classifier.pdfprocessor.convert_from_path")
-    def test_extract_images(self, mock_convert_from_path):
+    def test_extract_images_keep_images(self, mock_convert_from_path, pdf_file, temp_base_dir):
         mock_image = MagicMock()
         mock_convert_from_path.return_value = [mock_image]
-        self.pdf_data.extract_images()
-        self.assertEqual(len(self.pdf_data.image_files), 1)
+        pdf_data = PdfData(pdf_file, temp_base_dir, keep_images=True)
+        pdf_data.extract_images()
+        assert pdf_data.page_images == [mock_image]
+        assert len(pdf_data.image_files) == 1
         mock_image.save.assert_called_once()
 
+    @patch("classifier.pdfprocessor.pymupdf", None)
+    @patch("classifier.pdfprocessor.convert_from_path")
+    def test_extract_images_rendered(self, mock_convert_from_path, pdf_data):
+        (pdf_data.temp_dir / ".sig").write_text("17-0\n1")
+        (pdf_data.temp_dir / "page_1.csv").write_text("level\tconf\ttext\n5\t96.5\ttest\n")
+        pdf_data.extract_images()
+        mock_convert_from_path.assert_not_called()
+        pdf_data.extract_text()
+        assert pdf_data.data_files == [pdf_data.temp_dir / "page_1.csv"]
+        assert pdf_data.data[0].loc[0, "text"] == "test"
+
+    @patch("classifier.pdfprocessor.pymupdf", None)
     @patch("classifier.pdfprocessor.convert_from_path")
-    def test_extract_images_error(self, mock_convert_from_path):
+    def test_extract_images_changed_pdf(self, mock_convert_from_path, pdf_data):
+        (pdf_data.temp_dir / ".sig").write_text("12-0\n1")
+        (pdf_data.temp_dir / "page_1.csv").write_text("level\tconf\ttext\n5\t96.5\ttest\n")
+        mock_convert_from_path.return_value = [MagicMock()]
+        pdf_data.extract_images()
+        mock_convert_from_path.assert_called_once()
+        assert (pdf_data.temp_dir / ".sig").read_text() == "17-0\n1"
+
+    @patch("classifier.pdfprocessor.pymupdf")
+    def test_extract_images_pymupdf(self, mock_pymupdf, pdf_data):
+        mock_page = MagicMock()
+        mock_page.get_pixmap.return_value = MagicMock(width=2, height=1, stride=2, samples=bytes([0, 255]))
+        mock_pymupdf.open.return_value.__enter__.return_value = [mock_page]
+        pdf_data.extract_images()
+        assert len(pdf_data.page_images) == 1
+        assert pdf_data.page_images[0].mode == "L"
+        assert pdf_data.page_images[0].size == (2, 1)
+        assert mock_page.get_pixmap.call_args.kwargs["colorspace"] == mock_pymupdf.csGRAY
+
+    @patch("classifier.pdfprocessor.pymupdf", None)
+    @patch("classifier.pdfprocessor.convert_from_path")
+    def test_extract_images_error(self, mock_convert_from_path, pdf_data):
         mock_convert_from_path.side_effect = Exception("Test Error")
-        self.pdf_data.extract_images()
-        self.assertEqual(len(self.pdf_data.image_files), 0)
+        pdf_data.extract_images()
+        assert len(pdf_data.image_files) == 0
 
     @patch("classifier.pdfprocessor.pytesseract.image_to_data")
     @patch("classifier.pdfprocessor.Image.open")
-    def test_extract_text(self, mock_image_open, mock_image_to_data):
+    def test_extract_text(self, mock_image_open, mock_image_to_data, pdf_data):
         mock_image = MagicMock()
         mock_image_open.return_value.__enter__.return_value = mock_image
         mock_image_to_data.return_value = pd.DataFrame({"text": ["test"]})
-        self.pdf_data.image_files = [self.pdf_data.temp_dir / "page_1.png"]
-        self.pdf_data.extract_text()
-        self.assertEqual(len(self.pdf_data.data_files), 1)
-        self.assertEqual(len(self.pdf_data.data), 1)
+        pdf_data.image_files = [pdf_data.temp_dir / "page_1.png"]
+        pdf_data.extract_text()
+        assert len(pdf_data.data_files) == 1
+        assert len(pdf_data.data) == 1
         mock_image_to_data.assert_called_once()
 
     @patch("classifier.pdfprocessor.pytesseract.image_to_data")
     @patch("classifier.pdfprocessor.Image.open")
-    def test_extract_text_no_images(self, mock_image_open, mock_image_to_data):
-        self.pdf_data.extract_text()
-        self.assertEqual(len(self.pdf_data.data_files), 0)
-        self.assertEqual(len(self.pdf_data.data), 0)
+    def test_extract_text_in_memory(self, mock_image_open, mock_image_to_data, pdf_data):
+        mock_image_to_data.return_value = pd.DataFrame({"text": ["test"]})
+        pdf_data.page_images = [MagicMock()]
+        pdf_data.extract_text()
+        assert [pdf_data.temp_dir / "page_1.csv"] == pdf_data.data_files
+        assert len(pdf_data.data) == 1
+        assert pdf_data.page_images == []
+        mock_image_open.assert_not_called()
+
+    @patch("classifier.pdfprocessor.pytesseract.image_to_data")
+    def test_extract_text_ocr_threads(self, mock_image_to_data, pdf_file, temp_base_dir):
+        mock_image_to_data.return_value = pd.DataFrame({"text": ["test"]})
+        pdf_data = PdfData(pdf_file, temp_base_dir, ocr_threads=1)
+        pdf_data.page_images = [MagicMock(), MagicMock()]
+        with patch("classifier.pdfprocessor.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as mock_executor:
+            pdf_data.extract_text()
+        mock_executor.assert_called_once_with(max_workers=1)
+        assert len(pdf_data.data) == 2
+
+    @patch("classifier.pdfprocessor.pytesseract.image_to_data")
+    def test_extract_text_downcast(self, mock_image_to_data, pdf_data):
+        mock_image_to_data.return_value = pd.DataFrame({"level": [1, 5], "line_num": [0, 1], "left": [0, 10],
+                                                        "conf": [-1.0, 96.5], "text": [None, "Rechnung"]})
+        pdf_data.page_images = [MagicMock()]
+        pdf_data.extract_text()
+        text = pdf_data.data[0]
+        assert ["Rechnung"] == text["text"].tolist()
+        assert {"level": "int8", "line_num": "int16", "left": "int32", "conf": "float32", "text": "string"} == \
+               text.dtypes.astype(str).to_dict()
+
+    @patch("classifier.pdfprocessor.pytesseract.image_to_data")
+    def test_extract_text_gray_page(self, mock_image_to_data, pdf_data):
+        mock_image_to_data.return_value = pd.DataFrame({"text": ["test"]})
+        page = Image.new("L", (2, 1))
+        pdf_data.page_images = [page]
+        pdf_data.extract_text()
+        passed_image = mock_image_to_data.call_args.args[0]
+        assert passed_image is not page
+        assert passed_image.format == "PPM"
+        assert page.format is None
+
+    def test_image_to_data_format(self):
+        # the PGM temporary file relies on pytesseract saving the image in its format
+        with patch("classifier.pdfprocessor.pytesseract.image_to_data") as mock_image_to_data:
+            PdfData._image_to_data(Image.new("L", (2, 1)))
+        passed_image = mock_image_to_data.call_args.args[0]
+        _, extension = pytesseract.pytesseract.prepare(passed_image)
+        assert "PPM" == extension
+
+    @patch("classifier.pdfprocessor.pytesseract.image_to_data")
+    @patch("classifier.pdfprocessor.Image.open")
+    def test_extract_text_multiple_pages(self, mock_image_open, mock_image_to_data, pdf_data):
+        mock_image_to_data.side_effect = lambda *args, **kwargs: pd.DataFrame({"text": ["test"]})
+        pdf_data.image_files = [pdf_data.temp_dir / f"page_{i}.png" for i in range(1, 4)]
+        pdf_data.extract_text()
+        assert [pdf_data.temp_dir / f"page_{i}.csv" for i in range(1, 4)] == pdf_data.data_files
+        assert len(pdf_data.data) == 3
+        assert mock_image_to_data.call_count == 3
+
+    @patch("classifier.pdfprocessor.pytesseract.image_to_data")
+    @patch("classifier.pdfprocessor.Image.open")
+    def test_extract_text_no_images(self, mock_image_open, mock_image_to_data, pdf_data):
+        pdf_data.extract_text()
+        assert len(pdf_data.data_files) == 0
+        assert len(pdf_data.data) == 0
         mock_image_to_data.assert_not_called()
 
     @patch("classifier.pdfprocessor.pytesseract.image_to_data")
     @patch("classifier.pdfprocessor.Image.open")
-    def test_extract_text_error(self, mock_image_open, mock_image_to_data):
+    def test_extract_text_error(self, mock_image_open, mock_image_to_data, pdf_data):
         mock_image = MagicMock()
         mock_image_open.return_value.__enter__.return_value = mock_image
         mock_image_to_data.side_effect = Exception("Test Error")
-        self.pdf_data.image_files = [self.pdf_data.temp_dir / "page_1.png"]
-        self.pdf_data.extract_text()
-        self.assertEqual(len(self.pdf_data.data_files), 0)
-        self.assertEqual(len(self.pdf_data.data), 0)
+        pdf_data.image_files = [pdf_data.temp_dir / "page_1.png"]
+        pdf_data.extract_text()
+        assert len(pdf_data.data_files) == 0
+        assert len(pdf_data.data) == 0
 
     @patch("classifier.pdfprocessor.pytesseract.image_to_data")
     @patch("classifier.pdfprocessor.Image.open")
-    def test_extract_text_existing_data(self, mock_image_open, mock_image_to_data):
+    def test_extract_text_existing_data(self, mock_image_open, mock_image_to_data, pdf_data):
         mock_image = MagicMock()
         mock_image_open.return_value.__enter__.return_value = mock_image
         mock_image_to_data.return_value = pd.DataFrame({"text": ["test"]})
-        self.pdf_data.image_files = [self.pdf_data.temp_dir / "page_1.png"]
-        self.pdf_data.extract_text()
-        self.assertEqual(len(self.pdf_data.data_files), 1)
-        self.assertEqual(len(self.pdf_data.data), 1)
+        pdf_data.image_files = [pdf_data.temp_dir / "page_1.png"]
+        pdf_data.extract_text()
+        assert len(pdf_data.data_files) == 1
+        assert len(pdf_data.data) == 1
         mock_image_to_data.assert_called_once()
         mock_image_to_data.reset_mock()
-        self.pdf_data.extract_text()
+        pdf_data.extract_text()
         mock_image_to_data.assert_not_called()
 
+    def test_extract_text_existing_data_types(self, pdf_data):
+        data_path = pdf_data.temp_dir / "page_1.csv"
+        data_path.write_text("level\tpage_num\tconf\ttext\n1\t1\t-1\t\n5\t1\t96.5\tNA\n")
+        pdf_data.image_files = [pdf_data.temp_dir / "page_1.png"]
+        pdf_data.extract_text()
+        text = pdf_data.data[0]
+        assert text["level"].dtype == "int8"
+        assert text["conf"].dtype == "float32"
+        assert text["text"].dtype == "string"
+        assert pd.isna(text.loc[0, "text"])
+        assert text.loc[1, "text"] == "NA"
+
+    def test_ranked_pages(self, pdf_data):
+        blank = pd.DataFrame({"conf": [-1, 20.0], "text": [None, "x"]})
+        short = pd.DataFrame({"conf": [-1, 90.0], "text": [None, "short"]})
+        good = pd.DataFrame({"conf": [-1, 70.0, 80.0], "text": [None, "a" * 40, "b" * 40]})
+        better = pd.DataFrame({"conf": [-1, 95.0], "text": [None, "c" * 60]})
+        pdf_data.data = [blank, good, short, better]
+        ranked = pdf_data.ranked_pages()
+        assert len(ranked) == 2
+        assert ranked[0] is better
+        assert ranked[1] is good
 
-class TestPdfProcessor(unittest.TestCase):
-    def setUp(self):
-        self.temp_base_dir = Path(tempfile.mkdtemp())
-        self.pdf_processor = PdfProcessor(self.temp_base_dir)
-        self.pdf_folder = self.temp_base_dir / "pdf_folder"
-        self.pdf_folder.mkdir()
-        self.pdf_file = self.pdf_folder / "test.pdf"
-        with open(self.pdf_file, "w") as f:
-            f.write("dummy pdf content")
+    def test_ranked_pages_none_passes(self, pdf_data):
+        empty = pd.DataFrame({"conf": [-1], "text": [None]})
+        blank = pd.DataFrame({"conf": [-1, 20.0], "text": [None, "x"]})
+        short = pd.DataFrame({"conf": [-1, 90.0], "text": [None, "short"]})
+        pdf_data.data = [empty, blank, short]
+        assert [short] == pdf_data.ranked_pages()
 
-    def tearDown(self):
-        shutil.rmtree(self.temp_base_dir, ignore_errors=True)
+    def test_ranked_pages_no_data(self, pdf_data):
+        assert [] == pdf_data.ranked_pages()
+
+
+class TestPdfProcessor:
+    @pytest.fixture
+    def pdf_folder(self, pdf_file) -> Path:
+        _pdf_folder = MagicMock(spec=Path)
+        _pdf_folder.glob.return_value = [pdf_file]
+        return _pdf_folder
+
+    @pytest.fixture
+    def pdf_processor(self, temp_base_dir) -> PdfProcessor:
+        return PdfProcessor(temp_base_dir)
 
     @patch("classifier.pdfprocessor.PdfData")
-    def test_process_pdf(self, mock_data):
+    def test_process_pdf(self, mock_data, pdf_file, pdf_processor):
         mock_data.return_value = mm_pdf_data = MagicMock()
         mm_pdf_data.data_files = ["one"]
         mm_pdf_data.extract_text = MagicMock()
         mm_pdf_data.extract_images = MagicMock()
 
-        pdf_data = self.pdf_processor.process_pdf(self.pdf_file)
-        self.assertIsNotNone(pdf_data)
+        pdf_data = pdf_processor.process_pdf(pdf_file)
+        assert pdf_data is not None
         mm_pdf_data.extract_images.assert_called_once()
         mm_pdf_data.extract_text.assert_called_once()
 
-    def test_process_pdf_not_found(self):
-        pdf_data = self.pdf_processor.process_pdf(self.pdf_folder / "not_found.pdf")
-        self.assertIsNone(pdf_data)
+    def test_process_pdf_not_found(self, temp_base_dir, pdf_processor):
+        pdf_data = pdf_processor.process_pdf(temp_base_dir / "not_found.pdf")
+        assert pdf_data is None
 
     @patch("classifier.pdfprocessor.PdfProcessor.process_pdf")
-    def test_process_pdfs(self, mock_process_pdf):
+    def test_process_pdfs(self, mock_process_pdf, pdf_folder, pdf_processor):
         mock_process_pdf.return_value = MagicMock()
-        pdf_data_list = self.pdf_processor.process_pdfs(self.pdf_folder)
-        self.assertEqual(len(pdf_data_list), 1)
+        pdf_data_list = pdf_processor.process_pdfs(pdf_folder)
+        assert len(pdf_data_list) == 1
         mock_process_pdf.assert_called_once()
 
-    def test_process_pdfs_no_pdf(self):
-        pdf_data_list = self.pdf_processor.process_pdfs(self.temp_base_dir)
-        self.assertEqual(len(pdf_data_list), 0)
+    @pytest.mark.skipif(os.name == "nt", reason="the fake tesseract is a shell script")
+    def test_process_pdfs_workers(self, fake_tesseract, temp_base_dir, tmp_path):
+        for _name in ("SCN_0054.pdf", "SCN_0136.pdf"):
+            shutil.copy(RESOURCES / "pdf" / _name, tmp_path)
+        # the broken PDF has no pages, its None result is dropped
+        (tmp_path / "broken.pdf").write_text("no pdf")
+        pdf_processor = PdfProcessor(temp_base_dir, workers=2)
+        with patch.dict(os.environ, {"PATH": f"{fake_tesseract}{os.pathsep}{os.environ['PATH']}"}), \
+                patch("classifier.pdfprocessor.ProcessPoolExecutor", wraps=ProcessPoolExecutor) as mock_executor:
+            pdf_data_list = pdf_processor.process_pdfs(tmp_path)
+        mock_executor.assert_called_once_with(max_workers=2)
+        # the PdfData objects are pickled back from the worker processes
+        assert ["SCN_0054.pdf", "SCN_0136.pdf"] == sorted(_pdf_data.pdf_file.name for _pdf_data in pdf_data_list)
+        for _pdf_data in pdf_data_list:
+            assert ["Rechnung"] == _pdf_data.data[0]["text"].tolist()
+            assert max(1, (os.cpu_count() or 1) // 2) == _pdf_data.ocr_threads
+
+    @patch.dict(os.environ, {"PDF_WORKERS": "3"})
+    def test_workers_from_env(self, temp_base_dir):
+        pdf_processor = PdfProcessor(temp_base_dir)
+        assert pdf_processor.workers == 3
+
+    def test_process_pdfs_no_pdf(self, temp_base_dir, pdf_processor):
+        pdf_data_list = pdf_processor.process_pdfs(temp_base_dir)
+        assert len(pdf_data_list) == 0
 
-    def test_cleanup(self):
-        self.pdf_processor.cleanup()
-        self.assertFalse(self.temp_base_dir.exists())
+    def test_cleanup(self, tmp_path):
+        # the folder is removed, so the test does not use the shared folder of the module
+        pdf_processor = PdfProcessor(tmp_path)
+        pdf_processor.cleanup()
+        assert not tmp_path.exists()
 
 
 if __name__ == "__main__":
-    unittest.main()
+    raise SystemExit(pytest.main([__file__]))
@@ -1,7 +1,8 @@
-import shutil
-import tempfile
-import unittest
 from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
 
 from classifier.renamer import (
     find_pdf_in,
@@ -14,74 +15,88 @@ from classifier.renamer import (
 )
 from classifier.data import FileData
 
-class TestRenamer(unittest.TestCase):
-    def setUp(self):
-        self.temp_dir = Path(tempfile.mkdtemp())
 
-    def tearDown(self):
-        shutil.rmtree(self.temp_dir)
+@pytest.fixture(scope="module")
+def base_dir(tmp_path_factory) -> Path:
+    return tmp_path_factory.mktemp("renamer")
+
+
+@pytest.fixture
+def temp_dir(base_dir, request) -> Path:
+    """A folder of the test below the shared folder of the module."""
+    _dir = base_dir / request.node.name
+    _dir.mkdir()
+    return _dir
 
-    def test_find_pdf_in(self):
+
+class TestRenamer:
+    def test_find_pdf_in(self, temp_dir):
         # Create some dummy files
-        (self.temp_dir / "test1.pdf").touch()
-        (self.temp_dir / "test2.pdf").touch()
-        (self.temp_dir / "test3.txt").touch()
+        (temp_dir / "test1.pdf").touch()
+        (temp_dir / "test2.pdf").touch()
+        (temp_dir / "test3.txt").touch()
+
+        pdf_files = find_pdf_in(temp_dir)
+        assert len(pdf_files) == 2
+        assert all(f.suffix == ".pdf" for f in pdf_files)
+
+    def test_find_pdf_in_skips_folders(self, temp_dir):
+        (temp_dir / "test1.pdf").touch()
+        (temp_dir / "folder.pdf").mkdir()
 
-        pdf_files = find_pdf_in(self.temp_dir)
-        self.assertEqual(len(pdf_files), 2)
-        self.assertTrue(all(f.suffix == ".pdf" for f in pdf_files))
+        assert [temp_dir / "test1.pdf"] == find_pdf_in(temp_dir)
 
-    def test_find_pdf_in_empty(self):
-        pdf_files = find_pdf_in(self.temp_dir)
-        self.assertEqual(len(pdf_files), 0)
+    def test_find_pdf_in_empty(self, temp_dir):
+        pdf_files = find_pdf_in(temp_dir)
+        assert len(pdf_files) == 0
 
     def test_is_date_string(self):
-        self.assertTrue(is_date_string("2023-10-27"))
-        self.assertTrue(is_date_string("27.10.2023"))
-        self.assertTrue(is_date_string("27.10.23"))
-        self.assertTrue(is_date_string("20231027"))
-        self.assertFalse(is_date_string("not a date"))
-        self.assertFalse(is_date_string("2023-10-"))
-        self.assertFalse(is_date_string("2023-10-277"))
+        assert is_date_string("2023-10-27")
+        assert is_date_string("27.10.2023")
+        assert is_date_string("27.10.23")
+        assert is_date_string("20231027")
+        assert not is_date_string("not a date")
+        assert not is_date_string("2023-10-")
+        assert not is_date_string("2023-10-277")
 
     def test_sortable_date(self):
-        self.assertEqual("2023-10-27", sortable_date("2023-10-27"))
-        self.assertEqual("2023-10-27", sortable_date("27.10.2023"))
-        self.assertEqual("2027-10-23", sortable_date("27.10.23"))
-        self.assertEqual("2023-10-27", sortable_date("20231027"))
-        self.assertEqual("2010-23-27", sortable_date("10.27.23"))
-        self.assertEqual("2027-10-23", sortable_date("27.10.23"))
-        self.assertEqual("2023-10-27", sortable_date("23.10.27"))
-        self.assertEqual("2023-10-27", sortable_date("23.27.10"))
-        self.assertEqual("not a date", sortable_date("not a date"))
+        assert "2023-10-27" == sortable_date("2023-10-27")
+        assert "2023-10-27" == sortable_date("27.10.2023")
+        assert "2027-10-23" == sortable_date("27.10.23")
+        assert "2023-10-27" == sortable_date("20231027")
+        assert "2010-23-27" == sortable_date("10.27.23")
+        assert "2027-10-23" == sortable_date("27.10.23")
+        assert "2023-10-27" == sortable_date("23.10.27")
+        assert "2023-10-27" == sortable_date("23.27.10")
+        assert "not a date" == sortable_date("not a date")
 
     def test_sanitize_string_for_filename(self):
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test/file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test\\file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test*file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test?file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test:file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test\"file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test<file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test>file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test|file.pdf"))
-        self.assertEqual("test  file.pdf", sanitize_string_for_filename("test  file.pdf"))
-        self.assertEqual("test..file.pdf", sanitize_string_for_filename("test..file.pdf"))
-        self.assertEqual("test-file.pdf", sanitize_string_for_filename("test--file.pdf"))
-        self.assertEqual("test file.pdf", sanitize_string_for_filename(" test file.pdf "))
-        self.assertEqual("2023-10-27", sanitize_string_for_filename("2023-10-27"))
-        self.assertEqual("2023-10-27", sanitize_string_for_filename("27.10.2023"))
-        self.assertEqual("2027-10-23", sanitize_string_for_filename("27.10.23"))
-        self.assertEqual("2033-10-27", sanitize_string_for_filename("27.10.33"))
-        self.assertEqual("2025-10-27", sanitize_string_for_filename("25.27.10"))
-        self.assertEqual("2010-33-27", sanitize_string_for_filename("10.27.33")) # cannot interpret this correctly
-        self.assertEqual("2023-10-27", sanitize_string_for_filename("20231027"))
-        self.assertEqual("123", sanitize_string_for_filename(123))
-
-    def test_classify_pdf(self):
+        assert "test-file.pdf" == sanitize_string_for_filename("test/file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test\\file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test*file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test?file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test:file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test\"file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test<file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test>file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test|file.pdf")
+        assert "test  file.pdf" == sanitize_string_for_filename("test  file.pdf")
+        assert "test..file.pdf" == sanitize_string_for_filename("test..file.pdf")
+        assert "test-file.pdf" == sanitize_string_for_filename("test--file.pdf")
+        assert "test file.pdf" == sanitize_string_for_filename(" test file.pdf ")
+        assert "2023-10-27" == sanitize_string_for_filename("2023-10-27")
+        assert "2023-10-27" == sanitize_string_for_filename("27.10.2023")
+        assert "2027-10-23" == sanitize_string_for_filename("27.10.23")
+        assert "2033-10-27" == sanitize_string_for_filename("27.10.33")
+        assert "2025-10-27" == sanitize_string_for_filename("25.27.10")
+        assert "2010-33-27" == sanitize_string_for_filename("10.27.33") # cannot interpret this correctly
+        assert "2023-10-27" == sanitize_string_for_filename("20231027")
+        assert "123" == sanitize_string_for_filename(123)
+
+    def test_classify_pdf(self, temp_dir):
         # Create a dummy FileData object
         file_data = FileData()
-        file_data.id = str(self.temp_dir / "test.pdf")
+        file_data.id = str(temp_dir / "test.pdf")
         file_data.docdate = "2023-10-27"
         file_data.doctype = "invoice"
         file_data.sendername = "Test Sender"
@@ -91,13 +106,16 @@ class TestRenamer(unittest.TestCase):
         file_data.extension = "pdf"
         file_data.is_complete = True
 
-        new_path = classify_pdf(file_data, self.temp_dir)
-        self.assertEqual(self.temp_dir / "2023-10-27_invoice_Test Sender_123_Test Receiver_2023-10-28.pdf", new_path)
+        # the whole filename is never a date, it is not checked
+        with patch("classifier.renamer.is_date_string") as mock_is_date_string:
+            new_path = classify_pdf(file_data, temp_dir)
+        assert temp_dir / "2023-10-27_invoice_Test Sender_123_Test Receiver_2023-10-28.pdf" == new_path
+        mock_is_date_string.assert_not_called()
 
-    def test_classify_pdf_incomplete(self):
+    def test_classify_pdf_incomplete(self, temp_dir):
         # Create a dummy FileData object
         file_data = FileData()
-        file_data.id = str(self.temp_dir / "test.pdf")
+        file_data.id = str(temp_dir / "test.pdf")
         file_data.docdate = "2023-10-27"
         file_data.doctype = "invoice"
         file_data.sendername = "Test Sender"
@@ -107,13 +125,13 @@ class TestRenamer(unittest.TestCase):
         file_data.extension = "pdf"
         file_data.is_complete = False
 
-        new_path = classify_pdf(file_data, self.temp_dir)
-        self.assertIsNone(new_path)
+        new_path = classify_pdf(file_data, temp_dir)
+        assert new_path is None
 
-    def test_classify_pdf_no_outpath(self):
+    def test_classify_pdf_no_outpath(self, temp_dir):
         # Create a dummy FileData object
         file_data = FileData()
-        file_data.id = str(self.temp_dir / "test.pdf")
+        file_data.id = str(temp_dir / "test.pdf")
         file_data.docdate = "2023-10-27"
         file_data.doctype = "invoice"
         file_data.sendername = "Test Sender"
@@ -122,10 +140,31 @@ class TestRenamer(unittest.TestCase):
         file_data.dateoffile = "2023-10-28"
         file_data.extension = "pdf"
         file_data.is_complete = True
-        (self.temp_dir / "test.pdf").touch()
+        (temp_dir / "test.pdf").touch()
 
         new_path = classify_pdf(file_data)
-        self.assertEqual(self.temp_dir / "2023-10-27_invoice_Test Sender_123_Test Receiver_2023-10-28.pdf", new_path)
+        assert temp_dir / "2023-10-27_invoice_Test Sender_123_Test Receiver_2023-10-28.pdf" == new_path
+
+    def test_sanitize_filename_data_nan_field(self, temp_dir):
+        # an empty value of a cached feature file is read back as NaN, it is classified like an empty value
+        features = pd.DataFrame({
+            "key": ["id", "Document Date", "Document Type", "Sender", "Invoice Number"],
+            "value": [str(temp_dir / "test.pdf"), "2023-10-27", "Other", "Test Sender", float("nan")],
+            "quality": [1.0, 0.95, 0.95, 0.95, 0.95]
+        }).set_index("key")
+        raw_data = {"test.pdf": FileData().init_from_features(features)}
+
+        sanitized_data = sanitize_filename_data(raw_data)
+        assert "unknown" == sanitized_data["test.pdf"].docid
+        assert temp_dir / "2023-10-27_Other_Test Sender_unknown__.pdf" == classify_pdf(sanitized_data["test.pdf"], temp_dir)
+
+    def test_sanitize_filename_data_nan(self):
+        file_data = FileData()
+        file_data.id = "test.pdf"
+        file_data.docid = float("nan")
+
+        sanitized_data = sanitize_filename_data({"test.pdf": file_data})
+        assert "" == sanitized_data["test.pdf"].docid
 
     def test_sanitize_filename_data(self):
         # Create some dummy FileData objects
@@ -154,11 +193,11 @@ class TestRenamer(unittest.TestCase):
         raw_data = {"test1.pdf": file_data1, "test2.pdf": file_data2}
         sanitized_data = sanitize_filename_data(raw_data)
 
-        self.assertEqual("2023-10-27", sanitized_data["test1.pdf"].docdate)
-        self.assertEqual("Test-Sender", sanitized_data["test1.pdf"].sendername)
-        self.assertEqual("Test-Sender", sanitized_data["test2.pdf"].sendername)
-        self.assertEqual("2023-10-28", sanitized_data["test2.pdf"].docdate)
+        assert "2023-10-27" == sanitized_data["test1.pdf"].docdate
+        assert "Test-Sender" == sanitized_data["test1.pdf"].sendername
+        assert "Test-Sender" == sanitized_data["test2.pdf"].sendername
+        assert "2023-10-28" == sanitized_data["test2.pdf"].docdate
 
 
 if __name__ == "__main__":
-    unittest.main()
+    raise SystemExit(pytest.main([__file__]))